@@ -1,12 +1,68 @@
+import os
+import time
 import streamlit as st
 import pandas as pd
+import numpy as np
 from parsers import parse_baplie, parse_coprar, parse_equipment
-from genetic_algorithm import genetic_algorithm
+from genetic_algorithm import DischargeOptimizer, make_individual
+from fitness_cache import FitnessCache
+from decomposition import solve_by_bay
+from island_model import island_genetic_algorithm
+from multi_objective import pareto_sequences
+from discharge_cost import DischargeCostModel
+from crane_schedule import schedule_cranes
+from jobs import CANCELLED, FAILED, JobManager, input_key
+from reconcile import reconcile_containers
+from container_store import ContainerStore
+import parse_cache
 from visualization import visualize_containers_3d
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit.components.v1 as components
 
+# The app keeps repeat uploads fast with the parse cache unless CDS_PARSE_CACHE=0
+parse_cache.CACHE_ENABLED = os.environ.get('CDS_PARSE_CACHE', '1') != '0'
+# Per-generation GA statistics are appended here for offline tuning
+GA_STATS_PATH = os.environ.get('CDS_GA_STATS', 'ga_stats.jsonl')
+
+
+def run_sequencing(data, search_mode, memetic, time_budget, warm_start, callback):
+    # Runs on the job manager's thread, callback records progress and raises when cancelled.
+    # warm_start is (plan, population matrix) from an earlier run. Each job evolves its own optimizer
+    # with its own fitness cache, so concurrent jobs never share a population and log their own hit rates.
+    if search_mode == 'Hatch Decomposition':
+        return {'sequence': solve_by_bay(data, workers=os.cpu_count(), memetic=memetic, time_limit=time_budget, stagnation=20, callback=callback)}
+    if search_mode == 'Pareto Front (Time vs Stability)':
+        return {'front': pareto_sequences(data, time_limit=time_budget, callback=callback)}
+    if search_mode == 'Island Model':
+        return {'sequence': island_genetic_algorithm(data, workers=os.cpu_count(), time_limit=time_budget, callback=callback)}
+    previous_data, population = warm_start if warm_start is not None else (data, None)
+    with DischargeOptimizer(previous_data, memetic=memetic, cache=FitnessCache()) as optimizer:
+        if population is not None:
+            optimizer.population = [make_individual(row) for row in population]
+        if not optimizer.data.equals(data):
+            optimizer.update(data)
+        sequence = optimizer.optimize(time_limit=time_budget, stagnation=20, callback=callback)
+        optimizer.save_stats(GA_STATS_PATH)
+        return {'sequence': sequence, 'stop_reason': optimizer.last_run.stop_reason,
+                'generations': optimizer.last_run.generations, 'population': np.array(optimizer.population)}
+
+
+@st.cache_resource
+def get_job_manager():
+    return JobManager()
+
+
+def show_progress(records):
+    # Convergence chart of whatever fitness columns the optimizer reports
+    if not records:
+        return
+    progress = pd.DataFrame(records).set_index('gen')
+    columns = [column for column in ('best', 'mean') if column in progress.columns]
+    if columns:
+        st.line_chart(progress[columns])
+    st.dataframe(progress)
+
 
 # Serve static files
 def serve_static_file(path):
@@ -41,66 +97,129 @@ if baplie_file and coprar_file and equipment_file:
         
         # Display container details
         st.subheader('Container Details')
-        container_details = pd.merge(baplie_data, coprar_data, on='ContainerNumber', how='left')
-        
-        # Combine columns and remove duplicates
-        container_details['Weight'] = container_details.apply(lambda row: row['Weight_x'] if pd.notna(row['Weight_x']) else row['Weight_y'], axis=1)
-        container_details['Length'] = container_details.apply(lambda row: row['Length_x'] if pd.notna(row['Length_x']) else row['Length_y'], axis=1)
-        container_details['Width'] = container_details.apply(lambda row: row['Width_x'] if pd.notna(row['Width_x']) else row['Width_y'], axis=1)
-        container_details['Height'] = container_details.apply(lambda row: row['Height_x'] if pd.notna(row['Height_x']) else row['Height_y'], axis=1)
-        container_details = container_details[['ContainerNumber', 'Type', 'Weight', 'Length', 'Width', 'Height', 'Location']]
+        container_details, mismatches = reconcile_containers(baplie_data, coprar_data)
+        container_details = container_details[['ContainerNumber', 'Type', 'Weight', 'Length', 'Width', 'Height', 'Location', 'Bay', 'Row', 'Tier', 'Deck']]
         
         st.dataframe(container_details)
+
+        if not mismatches.empty:
+            st.subheader('BAPLIE/COPRAR Mismatches')
+            st.dataframe(mismatches)
+
+        # Keep the plan across reruns so a BAPLIE resend is applied as a diff
+        if 'container_store' not in st.session_state:
+            st.session_state['container_store'] = ContainerStore()
+        store = st.session_state['container_store']
+        plan_changes = store.apply(container_details)
+        if store.version > 1 and not plan_changes.is_empty():
+            st.session_state['plan_changes'] = plan_changes
+        if 'plan_changes' in st.session_state:
+            st.subheader('Changes Since Previous BAPLIE')
+            st.table(pd.DataFrame([st.session_state['plan_changes'].summary()]))
         
         # Navigation and Visualization
         if app_mode == "Discharge Sequencing":
             st.header('Discharge Sequencing Optimization')
+            time_budget = st.number_input('Time Budget (seconds)', min_value=1.0, value=10.0)
+            memetic = st.checkbox('Memetic Search (greedy seeding and local search)', value=True)
+            search_mode = st.selectbox('Search Mode', ['Single Population', 'Hatch Decomposition', 'Island Model', 'Pareto Front (Time vs Stability)'])
+            stability_preference = st.slider('Stability Preference (Pareto Front)', 0.0, 1.0, 0.0)
             
-            if st.button('Generate Discharge Sequence'):
-                if 'ContainerNumber' in baplie_data.columns and 'ContainerNumber' in coprar_data.columns:
-                    combined_data = pd.merge(baplie_data, coprar_data, on='ContainerNumber')
-                    
-                    if 'Weight' not in container_details.columns:
-                        st.error("'Weight' column is missing in the combined data.")
+            if 'ContainerNumber' not in baplie_data.columns or 'ContainerNumber' not in coprar_data.columns:
+                st.error("ContainerNumber column is missing in one of the datasets.")
+            elif 'Weight' not in container_details.columns:
+                st.error("'Weight' column is missing in the combined data.")
+            elif container_details.empty:
+                st.error("Combined data is empty after merging. Please check the input files.")
+            else:
+                # Same plan and settings map to the same job, so a finished result is reused
+                job_manager = get_job_manager()
+                job_key = input_key(container_details, search_mode=search_mode, memetic=memetic, time_budget=time_budget)
+                if st.button('Generate Discharge Sequence'):
+                    # Only the latest job is followed, so one started with other settings is stopped
+                    previous_key = st.session_state.get('sequencing_job')
+                    if previous_key is not None and previous_key != job_key:
+                        job_manager.cancel(previous_key)
+                    # A resent plan warm starts from the last finished population
+                    job_manager.submit(job_key, run_sequencing, container_details, search_mode, memetic, time_budget,
+                                       st.session_state.get('warm_start'))
+                    st.session_state['sequencing_job'] = job_key
+
+                job = job_manager.get(job_key) if st.session_state.get('sequencing_job') == job_key else None
+                if job is not None and job.active:
+                    st.info(f"Optimization {job.status}, {len(job.progress)} steps so far")
+                    show_progress(job.progress)
+                    if st.button('Cancel Optimization'):
+                        job_manager.cancel(job_key)
+                    time.sleep(1)
+                    st.rerun()
+                elif job is not None and job.status == FAILED:
+                    st.error(f"Optimization failed: {job.error}")
+                elif job is not None and job.status == CANCELLED:
+                    st.warning("Optimization cancelled.")
+                elif job is not None:
+                    result = job.result
+                    if 'population' in result:
+                        st.session_state['warm_start'] = (container_details, result['population'])
+                    show_progress(job.progress)
+                    if result.get('stop_reason'):
+                        st.caption(f"Stopped on {result['stop_reason'].replace('_', ' ')} after {result['generations']} generations")
+                    if 'front' in result:
+                        front = result['front']
+                        front_table = pd.DataFrame([(seconds, stress) for _, seconds, stress in front], columns=['Crane Seconds', 'Stability Stress (t·m)'])
+                        st.plotly_chart(px.line(front_table, x='Crane Seconds', y='Stability Stress (t·m)', markers=True, title='Pareto Front'))
+                        st.dataframe(front_table)
+                        # 0 takes the fastest sequence on the front, 1 the most stable
+                        sequence_indices = front[round(stability_preference * (len(front) - 1))][0]
                     else:
-                        if not container_details.empty:
-                            sequence_indices = genetic_algorithm(container_details)
-                            optimized_sequence = container_details.iloc[sequence_indices]
-                            
-                            fig = px.bar(optimized_sequence, x=optimized_sequence.index, y='Weight', title='Optimized Container Discharge Sequence')
-                            st.plotly_chart(fig)
-
-                            st.dataframe(optimized_sequence)
-                            
-                            # 3D Visualization for Discharge Sequence
-                            fig_3d = go.Figure(data=[go.Scatter3d(
-                                z=optimized_sequence.index,
-                                y=optimized_sequence['Weight'],
-                                x=optimized_sequence['Location'],
-                                mode='markers',
-                                marker=dict(
-                                    size=optimized_sequence['Weight'] / 1000,
-                                    color=optimized_sequence['Weight'],
-                                    colorscale='Viridis',
-                                    opacity=0.8
-                                ),
-                                text=optimized_sequence['ContainerNumber']
-                            )])
-                            fig_3d.update_layout(
-                                title="3D Visualization of Discharge Sequence",
-                                scene=dict(
-                                    xaxis_title='Location',
-                                    yaxis_title='Weight',
-                                    zaxis_title='Index',
-                                ),
-                                margin=dict(l=0, r=0, b=0, t=40)
-                            )
-                            st.plotly_chart(fig_3d)
-                        else:
-                            st.error("Combined data is empty after merging. Please check the input files.")
-                else:
-                    st.error("ContainerNumber column is missing in one of the datasets.")
-        
+                        sequence_indices = result['sequence']
+                    cost_model = DischargeCostModel(container_details)
+                    optimized_sequence = container_details.iloc[sequence_indices]
+
+                    st.write("Discharge Cost of the Sequence:")
+                    st.write({'Seconds': round(float(cost_model.score(sequence_indices)[0])), **cost_model.breakdown(sequence_indices)})
+
+                    st.subheader('Crane Schedule')
+                    try:
+                        crane_schedule, makespan, unassigned = schedule_cranes(container_details, equipment_data, sequence_indices)
+                        st.write(f"Estimated vessel makespan: {makespan / 3600:.1f} hours")
+                        if unassigned:
+                            st.warning(f"{len(unassigned)} containers are heavier than every crane or every landside unit and can't be discharged with this equipment.")
+                            st.dataframe(container_details.iloc[unassigned])
+                        st.dataframe(crane_schedule)
+                    except ValueError as e:
+                        st.warning(f"Crane schedule not available: {e}")
+                    
+                    fig = px.bar(optimized_sequence, x=optimized_sequence.index, y='Weight', title='Optimized Container Discharge Sequence')
+                    st.plotly_chart(fig)
+
+                    st.dataframe(optimized_sequence)
+                    
+                    # 3D Visualization for Discharge Sequence
+                    fig_3d = go.Figure(data=[go.Scatter3d(
+                        z=optimized_sequence.index,
+                        y=optimized_sequence['Weight'],
+                        x=optimized_sequence['Location'],
+                        mode='markers',
+                        marker=dict(
+                            size=optimized_sequence['Weight'] / 1000,
+                            color=optimized_sequence['Weight'],
+                            colorscale='Viridis',
+                            opacity=0.8
+                        ),
+                        text=optimized_sequence['ContainerNumber']
+                    )])
+                    fig_3d.update_layout(
+                        title="3D Visualization of Discharge Sequence",
+                        scene=dict(
+                            xaxis_title='Location',
+                            yaxis_title='Weight',
+                            zaxis_title='Index',
+                        ),
+                        margin=dict(l=0, r=0, b=0, t=40)
+                    )
+                    st.plotly_chart(fig_3d)
+
         elif app_mode == "3D Visualization":
             st.header('3D Visualization of Container Positions')
             
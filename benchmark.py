@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import parse_cache
+from genetic_algorithm import genetic_algorithm
+from parsers import parse_baplie, parse_coprar, parse_equipment
+from reconcile import reconcile_containers
+from synthetic import LAYOUTS, write_dataset
+from visualization import visualize_containers_3d
+
+DEFAULT_SIZES = [1000, 10000, 24000, 100000]
+# The GA stage is skipped above this many containers unless raised explicitly
+DEFAULT_OPTIMIZE_LIMIT = 5000
+
+
+def measure(func, *args, memory=True):
+    """Run func once untraced for wall time and, if memory, once under tracemalloc for peak bytes."""
+    start = time.perf_counter()
+    result = func(*args)
+    stats = {'seconds': time.perf_counter() - start}
+    if memory:
+        tracemalloc.start()
+        try:
+            func(*args)
+            stats['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, stats
+
+
+def parse_stage(paths):
+    vessel_info, baplie_data = parse_baplie(paths['baplie'])
+    coprar_data = parse_coprar(paths['coprar'])
+    equipment_data = parse_equipment(paths['equipment'])
+    return vessel_info, baplie_data, coprar_data, equipment_data
+
+
+def benchmark_size(directory, n_containers, layout, optimize_limit, memory=True, workers=None):
+    plan, paths = write_dataset(directory, n_containers, layout=layout)
+    result = {
+        'containers': n_containers,
+        'layout': layout,
+        'bays': int(plan['Bay'].nunique()),
+        'file_bytes': {name: os.path.getsize(path) for name, path in paths.items()},
+        'stages': {},
+    }
+    stages = result['stages']
+
+    (_, baplie_data, coprar_data, _), stages['parse'] = measure(parse_stage, paths, memory=memory)
+    (container_details, mismatches), stages['merge'] = measure(reconcile_containers, baplie_data, coprar_data, memory=memory)
+    stages['merge']['mismatches'] = len(mismatches)
+
+    if n_containers <= optimize_limit:
+        _, stages['optimize'] = measure(genetic_algorithm, container_details, workers, memory=memory)
+    else:
+        stages['optimize'] = {'skipped': f'more than {optimize_limit} containers'}
+
+    html, stages['render'] = measure(visualize_containers_3d, container_details.copy(), memory=memory)
+    stages['render']['html_bytes'] = len(html.encode('utf-8'))
+    return result
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'parse_cache': parse_cache.CACHE_ENABLED,
+    }
+
+
+def run(sizes, layout='ultra', optimize_limit=DEFAULT_OPTIMIZE_LIMIT, memory=True, directory=None, workers=None):
+    with tempfile.TemporaryDirectory() as temp_directory:
+        directory = directory or temp_directory
+        os.makedirs(directory, exist_ok=True)
+        results = []
+        for n_containers in sizes:
+            print(f'Benchmarking {n_containers} containers ({layout})')
+            results.append(benchmark_size(directory, n_containers, layout, optimize_limit, memory=memory, workers=workers))
+    return {'environment': environment(), 'workers': workers, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and memory-profile each stage of the CDS pipeline on synthetic vessels.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), default='ultra')
+    parser.add_argument('--optimize-limit', type=int, default=DEFAULT_OPTIMIZE_LIMIT)
+    parser.add_argument('--workers', type=int, help='score GA generations on this many processes')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--cache', action='store_true', help='let the parsers use the on-disk parse cache')
+    parser.add_argument('--keep', metavar='DIR', help='write the generated files to DIR instead of a temp directory')
+    parser.add_argument('--output', default='benchmark_report.json')
+    args = parser.parse_args()
+
+    parse_cache.CACHE_ENABLED = args.cache
+    report = run(args.sizes, args.layout, args.optimize_limit, memory=not args.no_memory, directory=args.keep, workers=args.workers)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
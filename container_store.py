@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from reconcile import lookup_positions
+
+TRACKED_COLUMNS = ['Type', 'Weight', 'Length', 'Width', 'Height']
+SLOT_COLUMNS = ['Bay', 'Row', 'Tier']
+
+
+class ChangeSet:
+    """Containers that differ between two versions of a stowage plan."""
+
+    def __init__(self, added=(), removed=(), moved=(), updated=(), stacks=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.moved = list(moved)
+        self.updated = list(updated)
+        self.stacks = set(stacks)  # (Bay, Row) stacks whose contents changed
+
+    @property
+    def changed(self):
+        return set(self.added) | set(self.removed) | set(self.moved) | set(self.updated)
+
+    def is_empty(self):
+        return not (self.added or self.removed or self.moved or self.updated)
+
+    def summary(self):
+        return {'Added': len(self.added), 'Removed': len(self.removed), 'Moved': len(self.moved), 'Updated': len(self.updated)}
+
+    def __repr__(self):
+        return f'ChangeSet({self.summary()})'
+
+
+class ContainerStore:
+    """Current stowage plan indexed by ContainerNumber and by (Bay, Row, Tier) slot.
+
+    Each BAPLIE resend is applied as a diff against the stored plan and the
+    resulting ChangeSet tells downstream stages which containers to revisit.
+    """
+
+    def __init__(self):
+        self.data = pd.DataFrame(columns=['ContainerNumber', 'Location'] + TRACKED_COLUMNS + SLOT_COLUMNS)
+        self.rows = {}  # ContainerNumber -> row of self.data
+        self.slots = {}
+        self.version = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, container_number):
+        row = self.rows.get(container_number)
+        return None if row is None else self.data.iloc[row]
+
+    def at(self, bay, row, tier):
+        return self.slots.get((bay, row, tier))
+
+    def apply(self, baplie_data):
+        new = baplie_data.drop_duplicates('ContainerNumber', keep='last').reset_index(drop=True)
+        old = self.data
+        old_rows = lookup_positions(new['ContainerNumber'], old['ContainerNumber'])
+        new_rows = lookup_positions(old['ContainerNumber'], new['ContainerNumber'])
+
+        added = old_rows < 0
+        removed = new_rows < 0
+        kept = np.flatnonzero(~added)
+        previous = old_rows[kept]
+
+        moved = _differs(new, old, kept, previous, ['Location'])
+        updated = _differs(new, old, kept, previous, TRACKED_COLUMNS) & ~moved
+
+        new_numbers = np.asarray(new['ContainerNumber'], dtype=object)
+        old_numbers = np.asarray(old['ContainerNumber'], dtype=object)
+        changes = ChangeSet(
+            added=new_numbers[added],
+            removed=old_numbers[removed],
+            moved=new_numbers[kept[moved]],
+            updated=new_numbers[kept[updated]],
+        )
+
+        # Only slots of containers that left or moved are touched
+        vacated = np.concatenate([np.flatnonzero(removed), previous[moved]])
+        occupied = np.concatenate([np.flatnonzero(added), kept[moved]])
+        for index, (bay, row, tier) in _slots(old, vacated):
+            if self.slots.get((bay, row, tier)) == old_numbers[index]:
+                del self.slots[(bay, row, tier)]
+            changes.stacks.add((bay, row))
+        for index, (bay, row, tier) in _slots(new, occupied):
+            self.slots[(bay, row, tier)] = new_numbers[index]
+            changes.stacks.add((bay, row))
+        changes.stacks.update((bay, row) for _, (bay, row, tier) in _slots(new, kept[updated]))
+
+        # Only containers that left, arrived or changed row in the frame are touched
+        for number in old_numbers[removed]:
+            del self.rows[number]
+        shifted = np.concatenate([np.flatnonzero(added), kept[kept != previous]])
+        self.rows.update(zip(new_numbers[shifted].tolist(), shifted.tolist()))
+
+        self.data = new
+        self.version += 1
+        return changes
+
+
+def _differs(new, old, new_rows, old_rows, columns):
+    differs = np.zeros(len(new_rows), dtype=bool)
+    for column in columns:
+        if column not in new.columns or column not in old.columns:
+            continue
+        new_values = np.asarray(new[column], dtype=object)[new_rows]
+        old_values = np.asarray(old[column], dtype=object)[old_rows]
+        differs |= ~((new_values == old_values) | (pd.isna(new_values) & pd.isna(old_values)))
+    return differs
+
+
+def _slots(data, rows):
+    # (row, slot) pairs; bay 0 means the position couldn't be decoded, so there is no slot to index
+    if not all(column in data.columns for column in SLOT_COLUMNS):
+        return []
+    rows = rows.astype(np.int64)
+    slots = data[SLOT_COLUMNS].to_numpy(dtype=np.int64)[rows]
+    return [(index, tuple(slot)) for index, slot in zip(rows.tolist(), slots.tolist()) if slot[0] != 0]
@@ -0,0 +1,218 @@
+import heapq
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from discharge_cost import DischargeCostModel, position_columns, restowed
+
+CRANE_TYPES = ('Crane',)
+CRANE_CYCLE_SECONDS = 120.0  # One ship-to-shore move, about 30 moves an hour
+# Landside round trip from the apron to the yard and back, per equipment type
+TRANSPORT_CYCLE_SECONDS = {'ReachStacker': 240.0, 'Forklift': 360.0}
+DEFAULT_TRANSPORT_CYCLE_SECONDS = 300.0
+# Cranes working at the same time stay this many hatches apart, 2 leaves one idle hatch between them
+MIN_HATCH_SEPARATION = 2
+# unassigned holds the row positions of boxes no crane or no landside equipment can handle
+CraneSchedule = namedtuple('CraneSchedule', ['schedule', 'makespan', 'unassigned'])
+SCHEDULE_COLUMNS = ['Crane', 'Order', 'ContainerNumber', 'Bay', 'Row', 'Tier', 'Weight', 'Restow', 'Start', 'Finish', 'Transport']
+
+
+def schedule_cranes(data, equipment, sequence=None, separation=MIN_HATCH_SEPARATION):
+    """Split a discharge sequence between the cranes in an equipment list and time it.
+
+    Equipment Capacity is read as safe working load in tonnes, and a box only
+    goes to a crane, and is handed to landside equipment, that can lift it.
+    Cranes are taken to stand along the quay in file order, fore to aft, and
+    each gets a contiguous run of hatches. The runs are chosen to minimise the
+    largest estimated crane workload, so cranes never cross. Every crane works
+    its hatches fore to aft, keeping the sequence's order inside a hatch, and
+    waits whenever it would come within separation hatches of a crane still
+    working.
+
+    Returns a CraneSchedule: one row per container in SCHEDULE_COLUMNS, with
+    Start and Finish in seconds from the start of discharge, the vessel
+    makespan, and the boxes that can't be discharged. A box heavier than
+    every crane, or than every landside unit when the list has any, is
+    infeasible: it keeps an empty Crane and Transport, takes no time, and
+    its row position is listed in unassigned.
+    """
+    cranes = equipment[equipment['Type'].isin(CRANE_TYPES)]
+    if cranes.empty:
+        raise ValueError("The equipment list has no cranes")
+    model = DischargeCostModel(data)
+    restow_seconds, gantry_seconds, bay_change_seconds = model.arrays['weights'].tolist()
+    bay, row, tier, forty_bay = position_columns(data)
+    weight = data['Weight'].to_numpy(dtype=np.float64, na_value=0) / 1000 if 'Weight' in data.columns else np.zeros(len(data))
+    sequence = np.arange(len(data)) if sequence is None else np.asarray(sequence, dtype=np.intp)
+
+    crane_ids = cranes['EquipmentID'].tolist()
+    crane_capacity = cranes['Capacity'].to_numpy(dtype=np.float64)
+    landside = equipment[~equipment['Type'].isin(CRANE_TYPES)]
+    landside_limit = landside['Capacity'].to_numpy(dtype=np.float64).max() if len(landside) else np.inf
+    liftable = (weight[sequence] <= crane_capacity.max()) & (weight[sequence] <= landside_limit)
+    unassigned = sequence[~liftable]
+    sequence = sequence[liftable]
+
+    # Fore to aft by hatch, keeping the sequence's order inside each hatch
+    decoded = sequence[bay[sequence] > 0]
+    decoded = decoded[np.argsort(forty_bay[decoded], kind='stable')]
+    undecoded = sequence[bay[sequence] <= 0]
+    hatches, starts = np.unique(forty_bay[decoded], return_index=True)
+    hatch_rows = np.split(decoded, starts[1:]) if len(decoded) else []
+
+    blocked = restowed(model.arrays, np.concatenate([decoded, undecoded, unassigned]))
+    workloads = [
+        len(rows) * CRANE_CYCLE_SECONDS + blocked[rows].sum() * restow_seconds
+        + np.count_nonzero(bay[rows][1:] != bay[rows][:-1]) * bay_change_seconds
+        for rows in hatch_rows
+    ]
+    hatch_weight = [weight[rows].max() for rows in hatch_rows]
+    zones = _crane_zones(hatches, workloads, hatch_weight, crane_capacity, gantry_seconds, bay_change_seconds)
+
+    queues = [np.concatenate([hatch_rows[h] for h in zone]) if zone else np.empty(0, dtype=np.intp) for zone in zones]
+    # Boxes without a decoded position go to the crane expected to finish first
+    if len(undecoded):
+        estimates = [sum(workloads[h] for h in zone) for zone in zones]
+        capable = [k for k in range(len(zones)) if crane_capacity[k] >= weight[undecoded].max()] or [int(np.argmax(crane_capacity))]
+        chosen = min(capable, key=lambda k: estimates[k])
+        queues[chosen] = np.concatenate([queues[chosen], undecoded])
+
+    # Boxes too heavy for their zone's crane when no zoning could satisfy every capacity
+    for k, queue in enumerate(queues):
+        heavy = weight[queue] > crane_capacity[k]
+        if heavy.any():
+            unassigned = np.concatenate([unassigned, queue[heavy]])
+            queues[k] = queue[~heavy]
+
+    timings = _simulate(queues, equipment, weight, bay, forty_bay, blocked, separation,
+                        restow_seconds, gantry_seconds, bay_change_seconds)
+
+    frames = []
+    for k, (queue, (start, finish, transport)) in enumerate(zip(queues, timings)):
+        frames.append(_schedule_frame(data, queue, crane_ids[k], blocked, start, finish, transport))
+    if len(unassigned):
+        empty = np.full(len(unassigned), np.nan)
+        frames.append(_schedule_frame(data, unassigned, None, blocked, empty, empty, [None] * len(unassigned)))
+    schedule = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=SCHEDULE_COLUMNS)
+    makespan = float(np.nanmax(schedule['Finish'])) if schedule['Finish'].notna().any() else 0.0
+    return CraneSchedule(schedule, makespan, unassigned.tolist())
+
+
+def _crane_zones(hatches, workloads, hatch_weight, crane_capacity, gantry_seconds, bay_change_seconds):
+    # Contiguous hatch runs per crane minimising the largest run, by dynamic programming
+    count, cranes = len(hatches), len(crane_capacity)
+    prefix = np.concatenate([[0.0], np.cumsum(workloads)])
+
+    def zone_cost(start, stop, crane, check_capacity):
+        if start == stop:
+            return 0.0
+        if check_capacity and max(hatch_weight[start:stop]) > crane_capacity[crane]:
+            return np.inf
+        travel = gantry_seconds * (hatches[stop - 1] - hatches[start]) + bay_change_seconds * (stop - start - 1)
+        return prefix[stop] - prefix[start] + travel
+
+    for check_capacity in (True, False):
+        best = np.full((cranes + 1, count + 1), np.inf)
+        split = np.zeros((cranes + 1, count + 1), dtype=int)
+        best[0, 0] = 0.0
+        for crane in range(1, cranes + 1):
+            for stop in range(count + 1):
+                for start in range(stop + 1):
+                    cost = max(best[crane - 1, start], zone_cost(start, stop, crane - 1, check_capacity))
+                    if cost < best[crane, stop]:
+                        best[crane, stop], split[crane, stop] = cost, start
+        if np.isfinite(best[cranes, count]):
+            break
+
+    zones, stop = [], count
+    for crane in range(cranes, 0, -1):
+        start = split[crane, stop]
+        zones.append(list(range(start, stop)))
+        stop = start
+    return zones[::-1]
+
+
+def _simulate(queues, equipment, weight, bay, forty_bay, blocked, separation,
+              restow_seconds, gantry_seconds, bay_change_seconds):
+    # Event-driven timing: the crane free soonest lifts its next box, then
+    # holds it until landside equipment that can carry it is free
+    landside = equipment[~equipment['Type'].isin(CRANE_TYPES)]
+    landside_ids = landside['EquipmentID'].tolist()
+    landside_capacity = landside['Capacity'].to_numpy(dtype=np.float64)
+    landside_cycle = [TRANSPORT_CYCLE_SECONDS.get(kind, DEFAULT_TRANSPORT_CYCLE_SECONDS) for kind in landside['Type']]
+    landside_free = [0.0] * len(landside_ids)
+
+    cranes = len(queues)
+    timings = [(np.zeros(len(queue)), np.zeros(len(queue)), [None] * len(queue)) for queue in queues]
+    position = [0] * cranes
+    hatch = [None] * cranes  # Hatch a crane is working, None before it starts and once it is done
+    next_time = [0.0] * cranes
+    events = [(0.0, k, k) for k in range(cranes) if len(queues[k])]
+    heapq.heapify(events)
+    counter = cranes
+
+    def push(k, time):
+        nonlocal counter
+        counter += 1
+        next_time[k] = time
+        heapq.heappush(events, (time, counter, k))
+
+    while events:
+        time, _, k = heapq.heappop(events)
+        queue, index = queues[k], position[k]
+        box = queue[index]
+        target = forty_bay[box] if bay[box] > 0 else None
+
+        if target is not None and target != hatch[k]:
+            waiting_on = [
+                other for other in range(cranes)
+                if other != k and hatch[other] is not None and abs(hatch[other] - target) < separation
+            ]
+            if waiting_on:
+                # Retry after the nearby crane's next move
+                push(k, max(time, next_time[waiting_on[0]]))
+                continue
+
+        start = time
+        if index:
+            previous = queue[index - 1]
+            if bay[box] > 0 and bay[previous] > 0:
+                start += gantry_seconds * abs(forty_bay[box] - forty_bay[previous])
+            start += bay_change_seconds * (bay[box] != bay[previous])
+        finish = start + CRANE_CYCLE_SECONDS + restow_seconds * blocked[box]
+
+        capable = [m for m in range(len(landside_ids)) if landside_capacity[m] >= weight[box]]
+        if capable:
+            machine = min(capable, key=lambda m: landside_free[m])
+            finish = max(finish, landside_free[machine])
+            landside_free[machine] = finish + landside_cycle[machine]
+            timings[k][2][index] = landside_ids[machine]
+
+        timings[k][0][index] = start
+        timings[k][1][index] = finish
+        position[k] += 1
+        if target is not None:
+            hatch[k] = target
+        if position[k] < len(queue):
+            push(k, finish)
+        else:
+            hatch[k] = None
+    return timings
+
+
+def _schedule_frame(data, rows, crane, blocked, start, finish, transport):
+    frame = pd.DataFrame({
+        'Crane': crane,
+        'Order': np.arange(1, len(rows) + 1),
+        'ContainerNumber': data['ContainerNumber'].to_numpy()[rows] if 'ContainerNumber' in data.columns else None,
+        'Bay': data['Bay'].to_numpy()[rows] if 'Bay' in data.columns else None,
+        'Row': data['Row'].to_numpy()[rows] if 'Row' in data.columns else None,
+        'Tier': data['Tier'].to_numpy()[rows] if 'Tier' in data.columns else None,
+        'Weight': data['Weight'].to_numpy()[rows] if 'Weight' in data.columns else None,
+        'Restow': blocked[rows],
+        'Start': start,
+        'Finish': finish,
+        'Transport': pd.Series(transport, dtype=object),
+    })
+    return frame[SCHEDULE_COLUMNS]
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+
+from discharge_cost import DischargeCostModel, position_columns
+from genetic_algorithm import DischargeOptimizer
+from local_search import greedy_sequences
+from parallel_fitness import get_pool
+
+# Hatches this small are sequenced by the best greedy order instead of a GA run
+SMALL_PARTITION = 8
+# A hatch holds a few hundred boxes at most, so a smaller GA is enough
+PARTITION_POPULATION = 50
+PARTITION_LOCAL_SEARCH = {'local_search_count': 2, 'local_search_moves': 100}
+
+
+def hatch_partitions(data):
+    """Row positions of data grouped by 40ft bay (hatch), undecoded positions last."""
+    bay, _, _, forty_bay = position_columns(data)
+    hatch = np.where(bay > 0, forty_bay, np.iinfo(np.int64).max)
+    order = np.argsort(hatch, kind='stable')
+    hatches, starts = np.unique(hatch[order], return_index=True)
+    return [(int(key) if key != np.iinfo(np.int64).max else None, rows)
+            for key, rows in zip(hatches, np.split(order, starts[1:]))]
+
+
+def _solve_partition(frame, seed, memetic, ngen, time_limit, stagnation):
+    # Runs in a pool worker, returns the hatch's order as positions in frame
+    random.seed(seed)
+    if len(frame) < SMALL_PARTITION:
+        model = DischargeCostModel(frame)
+        candidates = np.array(greedy_sequences(frame))
+        return candidates[np.argmin(model.score(candidates))]
+    with DischargeOptimizer(frame, population_size=PARTITION_POPULATION, memetic=memetic, **PARTITION_LOCAL_SEARCH) as optimizer:
+        return np.asarray(optimizer.optimize(ngen=ngen, time_limit=time_limit, stagnation=stagnation))
+
+
+def solve_by_bay(data, workers=None, memetic=True, ngen=None, time_limit=None, stagnation=None, callback=None):
+    """Discharge sequence built from independently optimized hatches.
+
+    Boxes in different 40ft bays never block each other, so each hatch is
+    sequenced on its own, concurrently when workers > 1. The hatch sequences
+    are then stitched in a gantry sweep, fore to aft or aft to fore, keeping
+    whichever scores lower for the whole vessel. A time_limit is shared out
+    between hatches by size, assuming they run workers at a time. callback
+    receives a record after each hatch is sequenced.
+    """
+    if not len(data):
+        return []
+    partitions = hatch_partitions(data)
+    positions = data[[column for column in ('Bay', 'Row', 'Tier') if column in data.columns]].reset_index(drop=True)
+    seeds = [random.getrandbits(64) for _ in partitions]
+    parallel = max(1, min(workers or 1, len(partitions)))
+
+    tasks = []
+    for (hatch, rows), seed in zip(partitions, seeds):
+        budget = None
+        if time_limit is not None:
+            budget = min(time_limit, time_limit * parallel * len(rows) / max(1, len(data)))
+        tasks.append((positions.iloc[rows].reset_index(drop=True), seed, memetic, ngen, budget, stagnation))
+
+    if parallel > 1:
+        pool = get_pool(parallel)
+        pending = [pool.submit(_solve_partition, *task) for task in tasks]
+        results = (future.result() for future in pending)
+    else:
+        results = (_solve_partition(*task) for task in tasks)
+    orders = []
+    try:
+        for order in results:
+            orders.append(order)
+            if callback is not None:
+                callback({'gen': len(orders), 'hatches': len(tasks)})
+    except BaseException:
+        if parallel > 1:
+            for future in pending:
+                future.cancel()
+        raise
+
+    sequences = [rows[order] for (_, rows), order in zip(partitions, orders)]
+    decoded = [sequence for (hatch, _), sequence in zip(partitions, sequences) if hatch is not None]
+    undecoded = [sequence for (hatch, _), sequence in zip(partitions, sequences) if hatch is None]
+    sweeps = np.array([np.concatenate(decoded + undecoded), np.concatenate(decoded[::-1] + undecoded)])
+    scores = DischargeCostModel(data).score(sweeps)
+    return sweeps[int(np.argmin(scores))].tolist()
@@ -0,0 +1,140 @@
+import numpy as np
+
+# Rough crane timings in seconds, tune per terminal
+RESTOW_SECONDS = 240.0  # Lift a blocking box aside and handle it again later
+GANTRY_SECONDS_PER_BAY = 25.0  # Gantry travel per 40ft bay
+BAY_CHANGE_SECONDS = 60.0  # Re-spotting the spreader on a different bay
+# Rows of the population scored together, bounds the size of the temporaries
+BLOCK_ELEMENTS = 1 << 21
+
+
+class DischargeCostModel:
+    """Order-dependent discharge time of a sequence, in seconds.
+
+    Discharging a container while a box stowed above it is still on board
+    costs a restow of that box, and moving the crane between bays costs gantry
+    travel plus a re-spotting delay. Blocking is precomputed from Bay/Row/Tier:
+    each 40ft bay (e.g. 02 over 01 and 03) and row is split into a fore and
+    an aft column, a 20ft box occupies one and a 40ft box both, and hold and
+    deck tiers of a column form one stack since the hatch cover has to come
+    off. Undecoded positions (bay 0) never block. A sequence is then scored in
+    linear time with a segmented running minimum over the stacks.
+    """
+
+    def __init__(self, data, restow_seconds=RESTOW_SECONDS, gantry_seconds=GANTRY_SECONDS_PER_BAY,
+                 bay_change_seconds=BAY_CHANGE_SECONDS):
+        self.arrays = discharge_arrays(data, restow_seconds, gantry_seconds, bay_change_seconds)
+
+    def __len__(self):
+        return len(self.arrays['bay'])
+
+    def score(self, sequences):
+        return discharge_costs(self.arrays, sequences)
+
+    def breakdown(self, sequence):
+        """Restows, bays travelled and bay changes of one sequence."""
+        restows, travel, changes = _components(self.arrays, np.asarray(sequence, dtype=np.intp)[None, :])
+        return {'Restows': int(restows[0]), 'Bays Travelled': int(travel[0]), 'Bay Changes': int(changes[0])}
+
+
+def position_columns(data):
+    """Bay, Row and Tier as int64 arrays, 0 where missing, plus the 40ft bay index."""
+    def column(name):
+        if name not in data.columns:
+            return np.zeros(len(data), dtype=np.int64)
+        return data[name].to_numpy(dtype=np.float64, na_value=0).astype(np.int64)
+
+    bay, row, tier = column('Bay'), column('Row'), column('Tier')
+    forty_bay = (bay - 1) // 4
+    forty_bay[bay <= 0] = 0
+    return bay, row, tier, forty_bay
+
+
+def discharge_arrays(data, restow_seconds=RESTOW_SECONDS, gantry_seconds=GANTRY_SECONDS_PER_BAY,
+                     bay_change_seconds=BAY_CHANGE_SECONDS):
+    bay, row, tier, forty_bay = position_columns(data)
+    size = len(bay)
+    known = np.flatnonzero(bay > 0)
+
+    # One stack entry per column a container occupies: fore (bay 4k+1), aft (4k+3), or both for 40ft
+    even = bay[known] % 2 == 0
+    halves = np.where(even, 0, (bay[known] % 4 == 3).astype(np.int64))
+    entry_container = np.concatenate([known, known[even]])
+    entry_half = np.concatenate([halves, np.ones(even.sum(), dtype=np.int64)])
+    order = np.lexsort((tier[entry_container], entry_half, row[entry_container], forty_bay[entry_container]))
+    entry_container = entry_container[order]
+    entry_half = entry_half[order]
+    stack_key = np.stack([forty_bay[entry_container], row[entry_container], entry_half])
+    segment_start = np.ones(len(entry_container), dtype=bool)
+    segment_start[1:] = np.any(stack_key[:, 1:] != stack_key[:, :-1], axis=0)
+    segment = np.cumsum(segment_start) - 1
+
+    # Each container's first and last entry, the same one unless it is a 40ft box
+    stacked, first_entry = np.unique(entry_container, return_index=True)
+    _, last_from_end = np.unique(entry_container[::-1], return_index=True)
+    last_entry = len(entry_container) - 1 - last_from_end
+
+    return {
+        'bay': bay,
+        'forty_bay': forty_bay,
+        'entry_container': entry_container,
+        'segment_offset': segment * (size + 1),
+        'segment_start': segment_start,
+        'stacked': stacked,
+        'first_entry': first_entry,
+        'last_entry': last_entry,
+        'weights': np.array([restow_seconds, gantry_seconds, bay_change_seconds], dtype=np.float64),
+    }
+
+
+def discharge_costs(arrays, sequences):
+    """Discharge time in seconds for every row of a population matrix."""
+    sequences = np.asarray(sequences, dtype=np.intp)
+    if sequences.ndim == 1:
+        sequences = sequences[None, :]
+    block = max(1, BLOCK_ELEMENTS // max(1, 2 * sequences.shape[1]))
+    costs = np.empty(len(sequences))
+    weights = arrays['weights']
+    for start in range(0, len(sequences), block):
+        restows, travel, changes = _components(arrays, sequences[start:start + block])
+        costs[start:start + block] = restows * weights[0] + travel * weights[1] + changes * weights[2]
+    return costs
+
+
+def restowed(arrays, sequence):
+    """Boolean per container, True where the sequence discharges it from under another box."""
+    sequence = np.asarray(sequence, dtype=np.intp)[None, :]
+    positions = _positions(sequence)
+    blocked = np.zeros(sequence.shape[1], dtype=bool)
+    blocked[arrays['stacked']] = (_earliest_below(arrays, positions) < positions[:, arrays['stacked']])[0]
+    return blocked
+
+
+def _positions(sequences):
+    count, size = sequences.shape
+    positions = np.empty_like(sequences)
+    positions[np.arange(count)[:, None], sequences] = np.arange(size)
+    return positions
+
+
+def _earliest_below(arrays, positions):
+    # Earliest discharge position below each stacked container: offsetting every
+    # stack far below the previous one turns a running minimum into a per-stack one
+    size = positions.shape[1]
+    shifted = positions[:, arrays['entry_container']] - arrays['segment_offset']
+    running = np.minimum.accumulate(shifted, axis=1)
+    below = np.empty_like(running)
+    below[:, 1:] = running[:, :-1]
+    below += arrays['segment_offset']
+    below[:, arrays['segment_start']] = size
+    return np.minimum(below[:, arrays['first_entry']], below[:, arrays['last_entry']])
+
+
+def _components(arrays, sequences):
+    positions = _positions(sequences)
+    restows = np.count_nonzero(_earliest_below(arrays, positions) < positions[:, arrays['stacked']], axis=1)
+
+    bays = arrays['bay'][sequences]
+    travel = np.abs(np.diff(arrays['forty_bay'][sequences], axis=1)).sum(axis=1)
+    changes = np.count_nonzero(bays[:, 1:] != bays[:, :-1], axis=1)
+    return restows, travel, changes
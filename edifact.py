@@ -0,0 +1,219 @@
+import codecs
+import mmap
+import os
+
+# UNA service string advice: component, element, decimal, release, reserved, terminator
+DEFAULT_SERVICE_CHARS = ":+.? '"
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = b' \t\r\n'
+
+
+def read_segments(file, chunk_size=CHUNK_SIZE, encoding='utf-8'):
+    """Yield (tag, elements) for every segment of an EDIFACT message.
+
+    The file is read in chunks so memory stays flat regardless of message size,
+    and segments may be split over lines or packed onto a single line. Each
+    element is a list of its components with release characters resolved.
+    """
+    chunks = _read_chunks(file, chunk_size, encoding)
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer.lstrip()) >= 9:
+            break
+
+    buffer = buffer.lstrip()
+    service_chars = DEFAULT_SERVICE_CHARS
+    if buffer.startswith('UNA'):
+        service_chars = buffer[3:9]
+        buffer = buffer[9:]
+    component_sep, element_sep, _, release, _, terminator = service_chars
+    if release == ' ':
+        release = None
+
+    start = 0
+    search = 0
+    while True:
+        end = buffer.find(terminator, search)
+        if end == -1:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            buffer = buffer[start:] + chunk
+            search = len(buffer) - len(chunk)
+            start = 0
+            continue
+        if release is not None and _is_released(buffer, start, end, release):
+            search = end + 1
+            continue
+        segment = buffer[start:end].lstrip()
+        start = search = end + 1
+        if segment:
+            yield split_segment(segment, element_sep, component_sep, release)
+
+    # A final segment without terminator is still worth returning
+    segment = buffer[start:].strip()
+    if segment:
+        yield split_segment(segment, element_sep, component_sep, release)
+
+
+def map_segments(path, tags=None, encoding='utf-8'):
+    """Yield (tag, elements) for the segments of the EDIFACT file at path.
+
+    The file is memory-mapped and segment boundaries are found over the raw
+    bytes; only segments whose tag is in tags (all when None) are decoded.
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from _scan_mapped(data, tags, encoding)
+
+
+def _scan_mapped(data, tags, encoding):
+    start = 0
+    while start < len(data) and data[start] in _WHITESPACE:
+        start += 1
+    service_chars = DEFAULT_SERVICE_CHARS
+    if data[start:start + 3] == b'UNA':
+        service_chars = data[start + 3:start + 9].decode(encoding)
+        start += 9
+    component_sep, element_sep, _, release, _, terminator = service_chars
+    if release == ' ':
+        release = None
+    terminator_byte = terminator.encode(encoding)
+    release_byte = release.encode(encoding)[0] if release else None
+
+    search = start
+    size = len(data)
+    while start < size:
+        end = data.find(terminator_byte, search)
+        if end == -1:
+            end = size
+        elif release_byte is not None and _is_released(data, start, end, release_byte):
+            search = end + 1
+            continue
+        while start < end and data[start] in _WHITESPACE:
+            start += 1
+        if start < end and (tags is None or data[start:start + 3] in tags):
+            segment = data[start:end].decode(encoding, errors='replace').rstrip()
+            yield split_segment(segment, element_sep, component_sep, release)
+        start = search = end + 1
+
+
+def segments(source, tags=None):
+    # Paths are memory-mapped, anything else is read as a stream
+    if isinstance(source, (str, os.PathLike)):
+        return map_segments(source, tags)
+    return read_segments(source)
+
+
+class MessageParser:
+    """Dispatch segments of one message type to handlers keyed on (tag, qualifier).
+
+    A handler registered with qualifier None receives every segment with that
+    tag that has no more specific handler.
+    """
+
+    def __init__(self, message_type):
+        self.message_type = message_type
+        self.handlers = {}
+        self.tags = set()
+
+    def handler(self, tag, qualifier=None):
+        def register(func):
+            self.handlers[(tag, qualifier)] = func
+            self.tags.add(tag.encode())
+            return func
+        return register
+
+    def parse(self, file, state):
+        handlers = self.handlers
+        for tag, elements in segments(file, self.tags):
+            qualifier = elements[0][0] if elements else ''
+            handler = handlers.get((tag, qualifier)) or handlers.get((tag, None))
+            if handler is not None:
+                handler(state, elements)
+        return state
+
+
+MESSAGE_PARSERS = {}
+
+
+def message_parser(message_type):
+    # One parser per message type, shared by everything that registers handlers for it
+    parser = MESSAGE_PARSERS.get(message_type)
+    if parser is None:
+        parser = MESSAGE_PARSERS[message_type] = MessageParser(message_type)
+    return parser
+
+
+def split_segment(segment, element_sep='+', component_sep=':', release='?'):
+    if '\n' in segment or '\r' in segment:
+        # Line breaks of a wrapped segment are not part of its data
+        segment = segment.replace('\r', '').replace('\n', '')
+    if release is None or release not in segment:
+        parts = segment.split(element_sep)
+        return parts[0], [part.split(component_sep) for part in parts[1:]]
+
+    elements = []
+    components = []
+    value = []
+    escaped = False
+    for char in segment:
+        if escaped:
+            value.append(char)
+            escaped = False
+        elif char == release:
+            escaped = True
+        elif char == component_sep:
+            components.append(''.join(value))
+            value = []
+        elif char == element_sep:
+            components.append(''.join(value))
+            elements.append(components)
+            components = []
+            value = []
+        else:
+            value.append(char)
+    components.append(''.join(value))
+    elements.append(components)
+    return elements[0][0], elements[1:]
+
+
+def read_message_type(file):
+    # Only reads as far as the UNH header
+    source = map_segments(file, {b'UNH'}) if isinstance(file, (str, os.PathLike)) else read_segments(file, chunk_size=1024)
+    for tag, elements in source:
+        if tag == 'UNH':
+            return component(elements, 1)
+    return None
+
+
+def component(elements, element, index=0, default=''):
+    try:
+        return elements[element][index]
+    except IndexError:
+        return default
+
+
+def _is_released(buffer, start, end, release):
+    # A terminator is escaped when preceded by an odd run of release characters
+    count = 0
+    position = end - 1
+    while position >= start and buffer[position] == release:
+        count += 1
+        position -= 1
+    return count % 2 == 1
+
+
+def _read_chunks(file, chunk_size, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        data = file.read(chunk_size)
+        if not data:
+            break
+        yield data if isinstance(data, str) else decoder.decode(data)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
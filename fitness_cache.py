@@ -0,0 +1,102 @@
+from collections import OrderedDict, namedtuple
+import hashlib
+import threading
+
+import numpy as np
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# Fixed multipliers keep keys stable between runs, so a vessel's entries stay reusable
+_MULTIPLIER_SEED = 0x5EED
+_multipliers = {}
+
+
+def permutation_keys(sequences):
+    """Hash every row of a population matrix at once.
+
+    Two independent linear hashes modulo 2**64 are computed with vectorized
+    multiply-adds, giving a 128-bit key per permutation.
+    """
+    sequences = np.asarray(sequences)
+    length = sequences.shape[1]
+    multipliers = _multipliers.get(length)
+    if multipliers is None:
+        rng = np.random.default_rng([_MULTIPLIER_SEED, length])
+        multipliers = _multipliers[length] = rng.integers(1, 2 ** 63, size=(2, length), dtype=np.uint64) | np.uint64(1)
+    values = sequences.astype(np.uint64)
+    first = (values * multipliers[0]).sum(axis=1, dtype=np.uint64)
+    second = (values * multipliers[1]).sum(axis=1, dtype=np.uint64)
+    return list(zip(first.tolist(), second.tolist()))
+
+
+def context_key(*arrays):
+    # Fingerprint of everything the fitness depends on, e.g. the per-container costs
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.digest()
+
+
+class FitnessCache:
+    """Bounded LRU of fitness values keyed by vessel context and permutation hash.
+
+    Safe to share between threads: lookups and stores hold a lock, scoring
+    the misses doesn't. Hit and miss counts are totals over all users, so
+    give each concurrent run its own cache when its hit rate matters.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def evaluate(self, individuals, evaluate_population, context=b''):
+        """Score individuals, calling evaluate_population only for unseen permutations."""
+        if not len(individuals):
+            return []
+        sequences = np.asarray(individuals)
+        keys = [(context, key) for key in permutation_keys(sequences)]
+
+        results = [None] * len(keys)
+        pending = {}
+        with self.lock:
+            for index, key in enumerate(keys):
+                fitness = self.entries.get(key)
+                if fitness is not None:
+                    self.entries.move_to_end(key)
+                    results[index] = fitness
+                    self.hits += 1
+                elif key in pending:
+                    pending[key].append(index)  # Same permutation twice in one batch
+                    self.hits += 1
+                else:
+                    pending[key] = [index]
+                    self.misses += 1
+
+        if pending:
+            rows = [indices[0] for indices in pending.values()]
+            fitnesses = evaluate_population(sequences[rows])
+            with self.lock:
+                for (key, indices), fitness in zip(pending.items(), fitnesses):
+                    self._store(key, fitness)
+                    for index in indices:
+                        results[index] = fitness
+        return results
+
+    def _store(self, key, fitness):
+        # Callers hold the lock
+        self.entries[key] = fitness
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -1,38 +1,371 @@
 from deap import base, creator, tools, algorithms
+import numpy as np
+import json
 import random
+import threading
+import time
+from datetime import datetime
+from collections import namedtuple
+from functools import partial
+from discharge_cost import DischargeCostModel, discharge_costs
+from parallel_fitness import ParallelEvaluator
+from fitness_cache import FitnessCache, context_key
+from reconcile import lookup_positions
+from local_search import LocalSearch, greedy_sequences, improve_best
 
-def genetic_algorithm(data):
+# Shared across runs, so re-optimising the same vessel reuses earlier scores
+fitness_cache = FitnessCache()
+# Optimizers finishing on different threads append to the same stats file
+_stats_lock = threading.Lock()
+
+POPULATION_SIZE = 300
+GENERATIONS = 40
+WARM_START_GENERATIONS = 10
+# Fittest individuals carried unchanged into the next generation, so seeds and local search gains survive
+ELITES = 5
+
+# stop_reason is one of 'generations', 'time_limit' or 'stagnation'
+EvolutionResult = namedtuple('EvolutionResult', ['stop_reason', 'generations', 'evaluations', 'elapsed', 'best_fitness', 'logbook'])
+LOGBOOK_HEADER = ['gen', 'evals', 'best', 'mean', 'diversity', 'evals_per_second', 'cache_hit_rate', 'elapsed']
+# Individuals compared against the best one when measuring diversity
+DIVERSITY_SAMPLE = 50
+
+# DEAP types are global, so they are created once per process
+if not hasattr(creator, "FitnessMin"):
     creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-    creator.create("Individual", list, fitness=creator.FitnessMin)
-    
-    def eval_sequence(individual):
-        total_weight = 0
-        total_moves = 0
-        weight_distribution = 0
-        for idx in individual:
-            container = data.iloc[idx]
-            total_weight += container['Weight']
-            total_moves += container['Length'] * container['Width']
-            # Assuming location is in the form 'row,column'
-            try:
-                location = container['Location'].split(',')
-                weight_distribution += abs(int(location[0]) - int(location[1])) * container['Weight']
-            except:
-                pass  # Skip invalid location formats
-        # Combine different aspects into a single fitness value
-        return total_weight + total_moves + weight_distribution,
-
-    toolbox = base.Toolbox()
-    toolbox.register("indices", random.sample, range(len(data)), len(data))
-    toolbox.register("individual", tools.initIterate, creator.Individual, toolbox.indices)
-    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-    toolbox.register("mate", tools.cxOrdered)
-    toolbox.register("mutate", tools.mutShuffleIndexes, indpb=0.05)
-    toolbox.register("select", tools.selTournament, tournsize=3)
-    toolbox.register("evaluate", eval_sequence)
-    
-    population = toolbox.population(n=300)
-    algorithms.eaSimple(population, toolbox, cxpb=0.5, mutpb=0.2, ngen=40, verbose=False)
-    
-    best_individual = tools.selBest(population, k=1)[0]
-    return best_individual
\ No newline at end of file
+if not hasattr(creator, "Individual"):
+    creator.create("Individual", np.ndarray, fitness=creator.FitnessMin)
+
+def evaluate_population(individuals, model):
+    # Score every individual at once as rows of a permutation matrix
+    if not len(individuals):
+        return []
+    return [(float(score),) for score in model.score(np.asarray(individuals, dtype=np.intp))]
+
+def make_rng():
+    # Seeded from the random module so random.seed still fixes the whole run
+    return np.random.default_rng(random.getrandbits(64))
+
+def make_individual(sequence):
+    # creator's ndarray constructor copies through a Python list, a view doesn't
+    individual = np.array(sequence, dtype=np.intp).view(creator.Individual)
+    individual.fitness = creator.FitnessMin()
+    return individual
+
+def clone_individual(individual):
+    # An array copy plus fitness, instead of DEAP's default deepcopy
+    clone = individual.copy()
+    clone.fitness = type(individual.fitness)()
+    if individual.fitness.valid:
+        clone.fitness.values = individual.fitness.values
+    return clone
+
+def cx_ordered(ind1, ind2):
+    # Same ordered crossover as tools.cxOrdered, done with array operations
+    size = min(len(ind1), len(ind2))
+    a, b = random.sample(range(size), 2)
+    if a > b:
+        a, b = b, a
+    parent1 = np.array(ind1[:size])
+    parent2 = np.array(ind2[:size])
+    ind1[:size] = _ordered_child(parent1, parent2, a, b)
+    ind2[:size] = _ordered_child(parent2, parent1, a, b)
+    return ind1, ind2
+
+def _ordered_child(parent, donor, a, b):
+    size = len(parent)
+    in_slice = np.zeros(size, dtype=bool)
+    in_slice[donor[a:b + 1]] = True
+    # Parent's remaining genes in order starting after the slice, written from there with wrap-around
+    order = np.concatenate((parent[b + 1:], parent[:b + 1]))
+    rest = order[~in_slice[order]]
+    tail = size - (b + 1)
+    child = np.empty_like(parent)
+    child[a:b + 1] = donor[a:b + 1]
+    child[b + 1:] = rest[:tail]
+    child[:a] = rest[tail:]
+    return child
+
+def mut_shuffle_indexes(individual, indpb, rng):
+    # Same swaps as tools.mutShuffleIndexes, with all random draws made in one go
+    size = len(individual)
+    positions = np.flatnonzero(rng.random(size) < indpb)
+    if size < 2 or not len(positions):
+        return individual,
+    targets = rng.integers(0, size - 1, len(positions))
+    targets += targets >= positions
+    genes = individual.tolist()
+    for i, j in zip(positions.tolist(), targets.tolist()):
+        genes[i], genes[j] = genes[j], genes[i]
+    individual[:] = genes
+    return individual,
+
+def population_diversity(population, best):
+    # Share of successor pairs in sampled individuals that the best sequence doesn't have
+    sample = np.asarray(population[:DIVERSITY_SAMPLE])
+    best = np.asarray(best)
+    if not len(sample) or len(best) < 2:
+        return 0.0
+    successor = np.full(len(best), -1)
+    successor[best[:-1]] = best[1:]
+    return float(np.mean(successor[sample[:, :-1]] != sample[:, 1:]))
+
+def evolve(population, toolbox, cxpb, mutpb, ngen=None, time_limit=None, stagnation=None, min_improvement=0.0,
+           hall_of_fame=None, cache=None, callback=None, elites=0):
+    """Anytime eaSimple: each generation's new individuals are scored in one batch.
+
+    Stops after ngen generations, before a generation would run past
+    time_limit seconds (judged by the slowest generation so far), or once the
+    best fitness hasn't improved by more than min_improvement for stagnation
+    generations, whichever comes first. The best individual ever seen is kept
+    in hall_of_fame. If the toolbox has an improve operator it is applied to
+    every scored generation. The elites fittest individuals of each
+    population replace the worst offspring of the next, so the best
+    fitness in the population never gets worse.
+
+    Every generation, including the initial one as gen 0, is recorded in a
+    Logbook with LOGBOOK_HEADER fields and passed to callback(record) as it
+    completes. cache_hit_rate is taken from cache.info() when a cache is given.
+    """
+    started = time.perf_counter()
+    hall_of_fame = hall_of_fame if hall_of_fame is not None else tools.HallOfFame(1, similar=np.array_equal)
+    logbook = tools.Logbook()
+    logbook.header = LOGBOOK_HEADER
+    cache_info = cache.info() if cache is not None else None
+
+    def record(gen, evals, seconds):
+        nonlocal cache_info
+        fitness = np.array([ind.fitness.values[0] for ind in population])
+        hit_rate = None
+        if cache is not None:
+            info = cache.info()
+            lookups = (info.hits - cache_info.hits) + (info.misses - cache_info.misses)
+            hit_rate = (info.hits - cache_info.hits) / lookups if lookups else 0.0
+            cache_info = info
+        logbook.record(gen=gen, evals=evals, best=float(fitness.min()), mean=float(fitness.mean()),
+                       diversity=population_diversity(population, population[int(fitness.argmin())]),
+                       evals_per_second=evals / seconds if seconds > 0 else 0.0, cache_hit_rate=hit_rate,
+                       elapsed=time.perf_counter() - started)
+        if callback is not None:
+            callback(logbook[-1])
+
+    def assign_fitness(individuals):
+        invalid = [ind for ind in individuals if not ind.fitness.valid]
+        for ind, fit in zip(invalid, toolbox.evaluate_population(invalid)):
+            ind.fitness.values = fit
+        if hasattr(toolbox, "improve"):
+            toolbox.improve(individuals)
+        hall_of_fame.update(individuals)
+        return len(invalid)
+
+    evaluations = assign_fitness(population)
+    slowest = time.perf_counter() - started
+    record(0, evaluations, slowest)
+    best = hall_of_fame[0].fitness.values[0]
+    stale = 0
+    gen = 0
+    reason = 'generations'
+    while True:
+        elapsed = time.perf_counter() - started
+        if ngen is not None and gen >= ngen:
+            reason = 'generations'
+            break
+        if time_limit is not None and elapsed + slowest > time_limit:
+            reason = 'time_limit'
+            break
+        if stagnation is not None and stale >= stagnation:
+            reason = 'stagnation'
+            break
+
+        generation_started = time.perf_counter()
+        offspring = toolbox.select(population, len(population))
+        offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        evals = assign_fitness(offspring)
+        evaluations += evals
+        if elites:
+            keep = sorted(population, key=lambda ind: ind.fitness.values[0])[:elites]
+            offspring.sort(key=lambda ind: ind.fitness.values[0])
+            offspring[len(offspring) - len(keep):] = [toolbox.clone(ind) for ind in keep]
+        population[:] = offspring
+        gen += 1
+        seconds = time.perf_counter() - generation_started
+        slowest = max(slowest, seconds)
+        record(gen, evals, seconds)
+
+        current = hall_of_fame[0].fitness.values[0]
+        stale = 0 if best - current > min_improvement else stale + 1
+        best = min(best, current)
+
+    return EvolutionResult(reason, gen, evaluations, time.perf_counter() - started, best, logbook)
+
+class DischargeOptimizer:
+    """GA over discharge sequences that keeps its toolbox and population between runs.
+
+    optimize() continues from the current population, so calling it again
+    refines the previous answer. Seeds (a best sequence or a whole previous
+    population) can be passed to warm start, and update() carries the
+    population over to a changed plan by ContainerNumber.
+
+    memetic=True seeds a cold start with greedy bay-sweep and tier-descending
+    orders (seed_fraction of the population, the rest random) and runs
+    delta-evaluated local search on the best offspring of every generation.
+    The elites fittest individuals are kept from one generation to the next.
+    """
+
+    def __init__(self, data, population_size=POPULATION_SIZE, workers=None, cache=fitness_cache,
+                 cxpb=0.5, mutpb=0.2, indpb=0.05, memetic=False, seed_fraction=0.2,
+                 local_search_count=5, local_search_moves=200, elites=ELITES):
+        # workers > 1 scores each generation on a shared-memory process pool, cache=None disables memoization
+        self.population_size = population_size
+        self.memetic = memetic
+        self.seed_fraction = seed_fraction
+        self.local_search_count = local_search_count
+        self.local_search_moves = local_search_moves
+        self.elites = elites
+        self.workers = workers
+        self.cache = cache
+        self.cxpb = cxpb
+        self.mutpb = mutpb
+        self.rng = make_rng()
+        self.population = []
+        self.hall_of_fame = tools.HallOfFame(1, similar=np.array_equal)
+        self.last_run = None
+        self.evaluator = None
+
+        self.toolbox = base.Toolbox()
+        self.toolbox.register("clone", clone_individual)
+        self.toolbox.register("mate", cx_ordered)
+        self.toolbox.register("mutate", mut_shuffle_indexes, indpb=indpb, rng=self.rng)
+        self.toolbox.register("select", tools.selTournament, tournsize=3)
+        self._set_data(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _set_data(self, data):
+        self.data = data
+        self.model = DischargeCostModel(data)
+        self.hall_of_fame.clear()
+        size = len(data)
+
+        def eval_sequence(individual):
+            return evaluate_population([individual], self.model)[0]
+
+        self.toolbox.register("indices", self.rng.permutation, size)
+        self.toolbox.register("individual", tools.initIterate, make_individual, self.toolbox.indices)
+        self.toolbox.register("population", tools.initRepeat, list, self.toolbox.individual)
+        self.toolbox.register("evaluate", eval_sequence)
+        if self.memetic:
+            self.toolbox.register("improve", improve_best, search=LocalSearch(self.model),
+                                  count=self.local_search_count, moves=self.local_search_moves)
+
+        self.close()
+        evaluate = partial(evaluate_population, model=self.model)
+        if self.workers and self.workers > 1:
+            self.evaluator = evaluate = ParallelEvaluator(discharge_costs, self.model.arrays, size, self.workers, self.population_size)
+        if self.cache is not None:
+            evaluate = partial(self.cache.evaluate, evaluate_population=evaluate, context=context_key(*self.model.arrays.values()))
+        self.toolbox.register("evaluate_population", evaluate)
+
+    def update(self, data):
+        """Switch to a changed plan, remapping the population by ContainerNumber."""
+        old_data, population = self.data, self.population
+        self._set_data(data)
+        self.population = []
+        if population and 'ContainerNumber' in old_data.columns and 'ContainerNumber' in data.columns:
+            new_rows = lookup_positions(old_data['ContainerNumber'], data['ContainerNumber'])
+            self.population = [self._repair(new_rows[individual]) for individual in population]
+
+    def _repair(self, sequence):
+        # Valid permutation from a partial one: drop stale and repeated indices, insert missing ones at random
+        size = len(self.data)
+        sequence = np.asarray(sequence, dtype=np.intp)
+        sequence = sequence[(sequence >= 0) & (sequence < size)]
+        _, first = np.unique(sequence, return_index=True)
+        sequence = sequence[np.sort(first)]
+        missing = np.setdiff1d(np.arange(size), sequence)
+        if len(missing):
+            positions = self.rng.integers(0, len(sequence) + 1, len(missing))
+            sequence = np.insert(sequence, positions, self.rng.permutation(missing))
+        return make_individual(sequence)
+
+    def seed(self, sequences):
+        """Start from given sequences, filling the population with mutants of them."""
+        self.population = self._seeded(sequences, self.population_size)
+
+    def _seeded(self, sequences, count):
+        sequences = np.asarray(sequences)
+        if sequences.ndim == 1:
+            sequences = sequences[None, :]
+        population = [self._repair(sequence) for sequence in sequences[:count]]
+        for index in range(len(population), count):
+            mutant, = self.toolbox.mutate(make_individual(population[index % len(population)]))
+            population.append(mutant)
+        return population
+
+    def _initial_population(self):
+        if not self.memetic:
+            return self.toolbox.population(n=self.population_size)
+        greedy = greedy_sequences(self.data)
+        seeded = self._seeded(greedy, min(self.population_size, max(len(greedy), int(self.seed_fraction * self.population_size))))
+        return seeded + self.toolbox.population(n=self.population_size - len(seeded))
+
+    def optimize(self, ngen=None, seeds=None, time_limit=None, stagnation=None, min_improvement=0.0, callback=None):
+        """Evolve and return the best sequence found so far as row positions.
+
+        Without any limit this runs GENERATIONS generations from scratch or
+        WARM_START_GENERATIONS when continuing from seeds or an earlier
+        population. With time_limit (seconds) or stagnation (generations)
+        it runs until one of them triggers; last_run records why it stopped
+        and holds the run's logbook. callback receives each generation's
+        logbook record as it completes.
+        """
+        started = time.perf_counter()
+        if seeds is not None and len(seeds):
+            self.seed(seeds)
+        warm = bool(self.population)
+        if not warm:
+            self.population = self._initial_population()
+        if ngen is None and time_limit is None and stagnation is None:
+            ngen = WARM_START_GENERATIONS if warm else GENERATIONS
+        if time_limit is not None:
+            time_limit -= time.perf_counter() - started
+        self.last_run = evolve(self.population, self.toolbox, cxpb=self.cxpb, mutpb=self.mutpb, ngen=ngen,
+                               time_limit=time_limit, stagnation=stagnation, min_improvement=min_improvement,
+                               hall_of_fame=self.hall_of_fame, cache=self.cache, callback=callback,
+                               elites=self.elites)
+        return self.best()
+
+    def save_stats(self, path):
+        """Append the last run's logbook to a JSON lines file, one generation per line."""
+        if self.last_run is None:
+            return
+        run = {
+            'run': datetime.now().isoformat(timespec='seconds'),
+            'containers': len(self.data),
+            'population_size': self.population_size,
+            'cxpb': self.cxpb,
+            'mutpb': self.mutpb,
+            'memetic': self.memetic,
+            'stop_reason': self.last_run.stop_reason,
+        }
+        lines = ''.join(json.dumps({**run, **record}) + '\n' for record in self.last_run.logbook)
+        with _stats_lock, open(path, 'a') as file:
+            file.write(lines)
+
+    def best(self):
+        if not len(self.hall_of_fame):
+            return None
+        return self.hall_of_fame[0].tolist()
+
+    def close(self):
+        if self.evaluator is not None:
+            self.evaluator.close()
+            self.evaluator = None
+
+def genetic_algorithm(data, workers=None, cache=fitness_cache, time_limit=None, stagnation=None, memetic=False):
+    with DischargeOptimizer(data, workers=workers, cache=cache, memetic=memetic) as optimizer:
+        return optimizer.optimize(time_limit=time_limit, stagnation=stagnation)
@@ -0,0 +1,76 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from edifact import read_message_type
+from parsers import parse_baplie, parse_coprar_message
+
+FILE_PARSERS = {
+    'BAPLIE': parse_baplie,
+    'COPRAR': parse_coprar_message,
+}
+KEY_COLUMNS = ['Vessel', 'Voyage', 'Message', 'File']
+
+
+def find_message_files(source):
+    if isinstance(source, (list, tuple)):
+        paths = source
+    elif os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*'))
+    else:
+        paths = glob.glob(source)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def parse_message_file(path):
+    # Runs in a worker process; failures are returned so one bad file doesn't sink the batch
+    try:
+        message_type = read_message_type(path)
+        parser = FILE_PARSERS.get(message_type)
+        if parser is None:
+            raise ValueError(f"Unsupported message type: {message_type or 'no UNH segment'}")
+        vessel_info, containers = parser(path)
+        return path, message_type, vessel_info, containers, None
+    except Exception as e:
+        return path, None, None, None, f"{type(e).__name__}: {e}"
+
+
+def ingest_messages(source, max_workers=None):
+    """Parse every BAPLIE/COPRAR file in a directory, glob or list of paths in parallel.
+
+    Returns the vessel info records (one row per file), the concatenated
+    container table keyed by vessel/voyage, and a table of per-file errors.
+    """
+    paths = find_message_files(source)
+    vessel_records = []
+    container_tables = []
+    errors = []
+
+    if paths:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(parse_message_file, path) for path in paths]
+            for future in as_completed(futures):
+                path, message_type, vessel_info, containers, error = future.result()
+                if error is not None:
+                    errors.append({'File': path, 'Error': error})
+                    continue
+                key = {
+                    'Vessel': vessel_info.get('Vessel Name', ''),
+                    'Voyage': vessel_info.get('Vessel Number', ''),
+                    'Message': message_type,
+                    'File': path,
+                }
+                vessel_records.append({**key, **vessel_info})
+                container_tables.append(containers.assign(**key))
+
+    vessel_df = pd.DataFrame(vessel_records, columns=None if vessel_records else KEY_COLUMNS)
+    if container_tables:
+        containers = pd.concat(container_tables, ignore_index=True)
+        containers = containers[KEY_COLUMNS + [c for c in containers.columns if c not in KEY_COLUMNS]]
+        containers = containers.sort_values(KEY_COLUMNS, kind='stable', ignore_index=True)
+        vessel_df = vessel_df.sort_values('File', ignore_index=True)
+    else:
+        containers = pd.DataFrame(columns=KEY_COLUMNS)
+    return vessel_df, containers, pd.DataFrame(errors, columns=['File', 'Error'])
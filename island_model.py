@@ -0,0 +1,102 @@
+import random
+import time
+
+import numpy as np
+
+from genetic_algorithm import GENERATIONS, DischargeOptimizer, make_individual
+from parallel_fitness import get_pool
+
+# Operator settings cycled over the islands, from exploitative to exploratory
+ISLAND_SETTINGS = [
+    {'cxpb': 0.5, 'mutpb': 0.2, 'indpb': 0.05},
+    {'cxpb': 0.7, 'mutpb': 0.1, 'indpb': 0.02},
+    {'cxpb': 0.3, 'mutpb': 0.4, 'indpb': 0.10},
+    {'cxpb': 0.6, 'mutpb': 0.2, 'indpb': 0.05, 'memetic': True},
+]
+TOPOLOGIES = ('ring', 'complete')
+
+
+def _evolve_island(frame, population, fitness, settings, population_size, ngen, seed):
+    # Runs in a pool worker: continue one island for ngen generations from its population matrix
+    random.seed(seed)
+    with DischargeOptimizer(frame, population_size=population_size, **settings) as optimizer:
+        if population is not None:
+            optimizer.population = [make_individual(row) for row in population]
+            for individual, value in zip(optimizer.population, fitness):
+                individual.fitness.values = (value,)
+        optimizer.optimize(ngen=ngen)
+        return (np.array(optimizer.population), np.array([ind.fitness.values[0] for ind in optimizer.population]),
+                np.array(optimizer.best()), optimizer.hall_of_fame[0].fitness.values[0])
+
+
+def _migrate(populations, fitnesses, migrants, topology):
+    # Best individuals of each island replace the worst of its neighbours
+    count = len(populations)
+    outgoing = [np.argsort(fitness)[:migrants] for fitness in fitnesses]
+    for target in range(count):
+        if topology == 'ring':
+            sources = [(target - 1) % count]
+        else:
+            sources = [source for source in range(count) if source != target]
+        rows = np.concatenate([populations[source][outgoing[source]] for source in sources])
+        values = np.concatenate([fitnesses[source][outgoing[source]] for source in sources])
+        worst = np.argsort(fitnesses[target])[::-1][:len(rows)]
+        populations[target][worst] = rows[:len(worst)]
+        fitnesses[target][worst] = values[:len(worst)]
+
+
+def island_genetic_algorithm(data, islands=4, workers=None, ngen=GENERATIONS, migration_interval=5, migrants=2,
+                             topology='ring', island_settings=ISLAND_SETTINGS, population_size=100, time_limit=None,
+                             callback=None):
+    """Island-model GA: sub-populations evolve apart and exchange their best individuals.
+
+    Island i uses island_settings[i % len(island_settings)] as keyword
+    arguments for DischargeOptimizer. Every migration_interval generations
+    the islands stop, each island's `migrants` best individuals replace the
+    worst ones of the next island ('ring') or of all others ('complete'),
+    and evolution resumes. Islands run on the process pool when workers > 1.
+    A time_limit stops before an epoch that would overrun it, and callback
+    receives a record with the generations done and best fitness after each.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology: {topology}")
+    if islands < 1 or not len(data):
+        return list(range(len(data)))
+    started = time.perf_counter()
+    frame = data[[column for column in ('Bay', 'Row', 'Tier') if column in data.columns]].reset_index(drop=True)
+    settings = [island_settings[index % len(island_settings)] for index in range(islands)]
+    pool = get_pool(min(workers, islands)) if workers and workers > 1 else None
+    # Islands reseed the random module when run in-process, so their seeds come from a separate generator
+    seeds = random.Random(random.getrandbits(64))
+
+    populations = [None] * islands
+    fitnesses = [None] * islands
+    best, best_fitness = None, np.inf
+    slowest = 0.0
+    done = 0
+    while done < ngen:
+        if time_limit is not None and time.perf_counter() - started + slowest > time_limit:
+            break
+        epoch_started = time.perf_counter()
+        epoch = min(migration_interval, ngen - done)
+        tasks = [(frame, populations[index], fitnesses[index], settings[index], population_size, epoch, seeds.getrandbits(64))
+                 for index in range(islands)]
+        if pool is not None:
+            results = [future.result() for future in [pool.submit(_evolve_island, *task) for task in tasks]]
+        else:
+            results = [_evolve_island(*task) for task in tasks]
+
+        for index, (population, fitness, island_best, island_best_fitness) in enumerate(results):
+            populations[index], fitnesses[index] = population, fitness
+            if island_best_fitness < best_fitness:
+                best, best_fitness = island_best, island_best_fitness
+        done += epoch
+        if callback is not None:
+            callback({'gen': done, 'best': best_fitness, 'elapsed': time.perf_counter() - started})
+        if done < ngen and islands > 1:
+            _migrate(populations, fitnesses, migrants, topology)
+        slowest = max(slowest, time.perf_counter() - epoch_started)
+
+    if best is None:
+        return list(range(len(data)))
+    return best.tolist()
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pending', 'running', 'done', 'failed', 'cancelled'
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def input_key(data, **settings):
+    """Hash of a plan's contents and the settings it is optimised with."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update(repr(list(data.columns)).encode())
+    digest.update(repr(sorted(settings.items())).encode())
+    return digest.hexdigest()
+
+
+class Job:
+    """One background optimisation, with its progress records and result."""
+
+    def __init__(self, key):
+        self.key = key
+        self.status = PENDING
+        self.progress = []
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in (PENDING, RUNNING)
+
+    def report(self, record):
+        # Passed to the optimizer as its callback, so cancellation lands between generations
+        self.progress.append(dict(record))
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished = time.time()
+
+
+class JobManager:
+    """Runs optimisations on a thread pool, keyed by input hash.
+
+    Submitting a key that is already running or finished returns that job,
+    so the same plan and settings are optimised once. Failed and cancelled
+    jobs are replaced. The function is called with callback=job.report and
+    should pass it on to the optimizer loop, which makes progress visible and
+    cancellation take effect at the next generation. Finished jobs beyond
+    max_jobs are forgotten oldest first.
+    """
+
+    def __init__(self, max_workers=2, max_jobs=32):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='optimizer')
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, key, function, *args, **kwargs):
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None and job.status not in (FAILED, CANCELLED):
+                self.jobs.move_to_end(key)
+                return job
+            job = self.jobs[key] = Job(key)
+            job.future = self.executor.submit(self._run, job, function, args, kwargs)
+            self._evict()
+            return job
+
+    def _run(self, job, function, args, kwargs):
+        if job._cancel.is_set():
+            job.status = CANCELLED
+            job.finished = time.time()
+            return
+        job.status = RUNNING
+        try:
+            job.result = function(*args, callback=job.report, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        job.finished = time.time()
+
+    def _evict(self):
+        finished = [key for key, job in self.jobs.items() if not job.active]
+        for key in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[key]
+
+    def get(self, key):
+        return self.jobs.get(key)
+
+    def cancel(self, key):
+        job = self.jobs.get(key)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            job.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
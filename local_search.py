@@ -0,0 +1,155 @@
+import random
+
+import numpy as np
+
+from discharge_cost import position_columns, restowed
+
+
+def greedy_sequences(data):
+    """Constructive discharge orders used to seed the GA.
+
+    Bay sweeps fore to aft and aft to fore, each emptying a 40ft bay top tier
+    first, and a tier-descending order that clears the vessel layer by layer.
+    """
+    bay, row, tier, forty_bay = position_columns(data)
+    return [
+        np.lexsort((row, bay, -tier, forty_bay)),
+        np.lexsort((row, bay, -tier, -forty_bay)),
+        np.lexsort((row, bay, forty_bay, -tier)),
+    ]
+
+
+class LocalSearch:
+    """Or-opt and 2-opt descent on a discharge sequence with delta evaluation.
+
+    Travel only depends on neighbouring pairs, so a move changes it at its
+    two or three boundaries. Restows only change for the moved containers and
+    the boxes stowed above them, whose blocked flags are rechecked against
+    their stack mates. A move costs O(k) for k containers moved and stack
+    height, instead of a full O(n) re-score.
+    """
+
+    def __init__(self, model, max_segment=32):
+        arrays = model.arrays
+        self.arrays = arrays
+        self.size = len(model)
+        self.max_segment = max_segment
+        self.bay = arrays['bay'].tolist()
+        self.forty_bay = arrays['forty_bay'].tolist()
+        self.restow_seconds, self.gantry_seconds, self.bay_change_seconds = arrays['weights'].tolist()
+
+        # Containers stowed below and above each one, across all its stacks
+        below = [set() for _ in range(self.size)]
+        above = [set() for _ in range(self.size)]
+        entries = arrays['entry_container'].tolist()
+        starts = np.flatnonzero(arrays['segment_start']).tolist() + [len(entries)]
+        for start, stop in zip(starts[:-1], starts[1:]):
+            stack = entries[start:stop]
+            for index, upper in enumerate(stack):
+                for lower in stack[:index]:
+                    below[upper].add(lower)
+                    above[lower].add(upper)
+        self.below = [tuple(containers) for containers in below]
+        self.above = [tuple(containers) for containers in above]
+
+        same_bay = {}
+        for container, bay in enumerate(self.forty_bay):
+            same_bay.setdefault(bay, []).append(container)
+        self.same_bay = [same_bay[bay] for bay in self.forty_bay]
+
+    def _step(self, a, b):
+        if a is None or b is None:
+            return 0.0
+        return (self.gantry_seconds * abs(self.forty_bay[a] - self.forty_bay[b])
+                + self.bay_change_seconds * (self.bay[a] != self.bay[b]))
+
+    def _restow_delta(self, affected, position, blocked):
+        # Blocked flags of affected containers under the trial positions
+        changed = {}
+        for container in affected:
+            own = position(container)
+            now = any(position(lower) < own for lower in self.below[container])
+            if now != blocked[container]:
+                changed[container] = now
+        return sum(1 if now else -1 for now in changed.values()), changed
+
+    def improve(self, sequence, moves=200):
+        """First-improvement descent over random candidate moves.
+
+        Returns the improved sequence as an array and the change in cost.
+        """
+        sequence = np.asarray(sequence).tolist()
+        size = len(sequence)
+        if size < 3:
+            return np.asarray(sequence, dtype=np.intp), 0.0
+        positions = [0] * size
+        for index, container in enumerate(sequence):
+            positions[container] = index
+        blocked = restowed(self.arrays, sequence).tolist()
+
+        def at(index):
+            return sequence[index] if 0 <= index < size else None
+
+        total = 0.0
+        for _ in range(moves):
+            i = random.randrange(size)
+            container = sequence[i]
+            if random.random() < 0.5:
+                # Or-opt: reinsert the container next to a box of the same 40ft bay
+                target = positions[random.choice(self.same_bay[container])] + random.randint(0, 1)
+                if target in (i, i + 1):
+                    continue
+                travel = (self._step(at(i - 1), at(i + 1)) - self._step(at(i - 1), container) - self._step(container, at(i + 1))
+                          + self._step(at(target - 1), container) + self._step(container, at(target))
+                          - self._step(at(target - 1), at(target)))
+                trial = target - 0.5
+                restows, changed = self._restow_delta(
+                    (container,) + self.above[container],
+                    lambda c: trial if c == container else positions[c],
+                    blocked,
+                )
+                delta = travel + restows * self.restow_seconds
+                if delta >= -1e-9:
+                    continue
+                sequence.pop(i)
+                sequence.insert(target if target < i else target - 1, container)
+                low, high = min(i, target), min(max(i, target), size - 1)
+            else:
+                # 2-opt: reverse a short segment
+                j = min(size - 1, i + random.randint(1, self.max_segment - 1))
+                if j == i:
+                    continue
+                travel = (self._step(at(i - 1), at(j)) + self._step(at(i), at(j + 1))
+                          - self._step(at(i - 1), at(i)) - self._step(at(j), at(j + 1)))
+                segment = sequence[i:j + 1]
+                affected = set(segment)
+                for moved in segment:
+                    affected.update(self.above[moved])
+                restows, changed = self._restow_delta(
+                    affected,
+                    lambda c: i + j - positions[c] if i <= positions[c] <= j else positions[c],
+                    blocked,
+                )
+                delta = travel + restows * self.restow_seconds
+                if delta >= -1e-9:
+                    continue
+                sequence[i:j + 1] = segment[::-1]
+                low, high = i, j
+
+            for index in range(low, high + 1):
+                positions[sequence[index]] = index
+            for changed_container, now in changed.items():
+                blocked[changed_container] = now
+            total += delta
+        return np.asarray(sequence, dtype=np.intp), total
+
+
+def improve_best(individuals, search, count=5, moves=200):
+    """Run local search on the count fittest individuals, updating their fitness from the deltas."""
+    ranked = sorted((ind for ind in individuals if ind.fitness.valid), key=lambda ind: ind.fitness.values[0])
+    for individual in ranked[:count]:
+        improved, delta = search.improve(individual, moves)
+        if delta < 0:
+            individual[:] = improved
+            individual.fitness.values = (individual.fitness.values[0] + delta,)
+    return individuals
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+from deap import algorithms, base, creator, tools
+
+from discharge_cost import DischargeCostModel
+from genetic_algorithm import GENERATIONS, clone_individual, cx_ordered, make_rng, mut_shuffle_indexes
+from local_search import greedy_sequences
+from stability import StabilityModel
+
+PARETO_POPULATION_SIZE = 100  # selTournamentDCD needs a multiple of four
+
+if not hasattr(creator, "FitnessPareto"):
+    creator.create("FitnessPareto", base.Fitness, weights=(-1.0, -1.0))
+if not hasattr(creator, "ParetoIndividual"):
+    creator.create("ParetoIndividual", np.ndarray, fitness=creator.FitnessPareto)
+
+
+def _make_individual(sequence):
+    individual = np.array(sequence, dtype=np.intp).view(creator.ParetoIndividual)
+    individual.fitness = creator.FitnessPareto()
+    return individual
+
+
+def evaluate_objectives(individuals, cost_model, stability_model):
+    # Crane seconds and stability stress for the whole batch in two vectorized passes
+    if not len(individuals):
+        return []
+    sequences = np.asarray(individuals, dtype=np.intp)
+    return list(zip(cost_model.score(sequences).tolist(), stability_model.score(sequences).tolist()))
+
+
+def pareto_sequences(data, population_size=PARETO_POPULATION_SIZE, ngen=GENERATIONS, time_limit=None,
+                     cxpb=0.7, mutpb=0.2, indpb=0.05, callback=None):
+    """NSGA-II over discharge sequences, trading crane time against stability stress.
+
+    Returns the first Pareto front as (sequence, crane seconds, stress in
+    tonne-metres) tuples ordered by crane time. The greedy sweeps seed the
+    fast end of the front. A time_limit stops before a generation that would
+    overrun it, judged by the slowest generation so far. callback receives
+    each generation's record with the fastest crane time and the front size.
+    """
+    started = time.perf_counter()
+    if not len(data):
+        return []
+    population_size = max(4, population_size - population_size % 4)
+    cost_model = DischargeCostModel(data)
+    stability_model = StabilityModel(data)
+    rng = make_rng()
+
+    toolbox = base.Toolbox()
+    toolbox.register("indices", rng.permutation, len(data))
+    toolbox.register("individual", tools.initIterate, _make_individual, toolbox.indices)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("clone", clone_individual)
+    toolbox.register("mate", cx_ordered)
+    toolbox.register("mutate", mut_shuffle_indexes, indpb=indpb, rng=rng)
+    toolbox.register("select", tools.selNSGA2)
+    toolbox.register("evaluate_population", evaluate_objectives, cost_model=cost_model, stability_model=stability_model)
+
+    def assign_fitness(individuals):
+        invalid = [ind for ind in individuals if not ind.fitness.valid]
+        for ind, fit in zip(invalid, toolbox.evaluate_population(invalid)):
+            ind.fitness.values = fit
+
+    seeds = [_make_individual(sequence) for sequence in greedy_sequences(data)][:population_size]
+    population = seeds + toolbox.population(n=population_size - len(seeds))
+    assign_fitness(population)
+    # Assigns the crowding distances selTournamentDCD relies on
+    population = toolbox.select(population, population_size)
+
+    slowest = 0.0
+    for gen in range(1, ngen + 1):
+        if time_limit is not None and time.perf_counter() - started + slowest > time_limit:
+            break
+        generation_started = time.perf_counter()
+        offspring = tools.selTournamentDCD(population, len(population))
+        offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        assign_fitness(offspring)
+        population = toolbox.select(population + offspring, population_size)
+        slowest = max(slowest, time.perf_counter() - generation_started)
+        if callback is not None:
+            callback({
+                'gen': gen,
+                'best': min(ind.fitness.values[0] for ind in population),
+                'front_size': len(tools.sortNondominated(population, len(population), first_front_only=True)[0]),
+                'elapsed': time.perf_counter() - started,
+            })
+
+    front = tools.sortNondominated(population, len(population), first_front_only=True)[0]
+    unique = {}
+    for individual in front:
+        unique.setdefault(individual.fitness.values, individual)
+    return [(individual.tolist(), *values) for values, individual in sorted(unique.items())]
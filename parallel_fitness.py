@@ -0,0 +1,112 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_pools = {}
+_attached = {}  # Worker side: shared memory name -> (segment, array)
+MAX_ATTACHED = 32
+
+
+def get_pool(workers):
+    # One persistent pool per worker count, shared by every optimisation run
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+@atexit.register
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+
+
+class SharedArray:
+    """A NumPy array living in a multiprocessing.shared_memory segment."""
+
+    def __init__(self, shape, dtype):
+        dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        self.segment = shared_memory.SharedMemory(create=True, size=size)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.segment.buf)
+        self.spec = (self.segment.name, tuple(shape), dtype.str)
+
+    @classmethod
+    def from_array(cls, values):
+        shared = cls(values.shape, values.dtype)
+        shared.array[...] = values
+        return shared
+
+    def close(self):
+        self.array = None
+        self.segment.close()
+        self.segment.unlink()
+
+
+def _attach_all(specs):
+    arrays = {}
+    for key, (name, shape, dtype) in specs.items():
+        attached = _attached.get(name)
+        if attached is None:
+            segment = shared_memory.SharedMemory(name=name)
+            attached = _attached[name] = (segment, np.ndarray(shape, dtype=dtype, buffer=segment.buf))
+        arrays[key] = attached[1]
+
+    # Segments of finished runs are dropped so workers don't pin them
+    if len(_attached) > MAX_ATTACHED:
+        needed = {name for name, _, _ in specs.values()}
+        for name in [name for name in _attached if name not in needed]:
+            segment, array = _attached.pop(name)
+            del array
+            segment.close()
+    return arrays
+
+
+def _score_rows(score, array_specs, sequences_spec, start, stop):
+    arrays = _attach_all({**array_specs, None: sequences_spec})
+    sequences = arrays.pop(None)
+    return score(arrays, sequences[start:stop])
+
+
+class ParallelEvaluator:
+    """Drop-in for evaluate_population that scores row blocks on a process pool.
+
+    score(arrays, sequences) must be a module-level function returning one
+    cost per row. The model arrays and the population matrix are placed in
+    shared memory, so each task only carries segment names and a row range.
+    Rows are scored independently, so fitness values match the serial path.
+    """
+
+    def __init__(self, score, arrays, sequence_length, workers, population_size):
+        self.score = score
+        self.workers = workers
+        self.pool = get_pool(workers)
+        self.arrays = {name: SharedArray.from_array(np.ascontiguousarray(values)) for name, values in arrays.items()}
+        self.array_specs = {name: shared.spec for name, shared in self.arrays.items()}
+        self.size = sequence_length
+        self.sequences = SharedArray((population_size, self.size), np.intp)
+
+    def __call__(self, individuals):
+        count = len(individuals)
+        if not count:
+            return []
+        if count > self.sequences.array.shape[0]:
+            self.sequences.close()
+            self.sequences = SharedArray((count, self.size), np.intp)
+        self.sequences.array[:count] = individuals
+
+        bounds = np.linspace(0, count, min(self.workers, count) + 1).astype(int)
+        futures = [
+            self.pool.submit(_score_rows, self.score, self.array_specs, self.sequences.spec, start, stop)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        scores = np.concatenate([future.result() for future in futures])
+        return [(float(score),) for score in scores]
+
+    def close(self):
+        for shared in self.arrays.values():
+            shared.close()
+        self.sequences.close()
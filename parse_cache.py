@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    import pyarrow as pa
+except ImportError:  # The cache is an optimisation, parsing works without it
+    pa = None
+
+# Bump whenever parser output changes so stale entries are never served
+PARSER_VERSION = '2'
+# Off unless asked for, so library use and tests never write to disk. CDS_CACHE_DIR turns it on
+# in that directory, CDS_PARSE_CACHE=1 in DEFAULT_CACHE_DIR, and the app switches it on itself.
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cds')
+CACHE_DIR = os.environ.get('CDS_CACHE_DIR')
+CACHE_ENABLED = os.environ.get('CDS_PARSE_CACHE', '1' if CACHE_DIR else '0') != '0'
+MAX_CACHE_BYTES = int(os.environ.get('CDS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+MAX_CACHE_AGE = float(os.environ.get('CDS_CACHE_MAX_AGE', 7 * 24 * 3600))
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def parse_cached(kind, file, parse, cache_dir=None):
+    """Return parse(file) -> (vessel_info, frame), reading it from the on-disk cache when possible.
+
+    Entries are Arrow IPC files named after a hash of the file bytes, the
+    message kind and PARSER_VERSION, so a repeat load is a memory-mapped read.
+    """
+    cache_dir = cache_dir or CACHE_DIR or DEFAULT_CACHE_DIR
+    key = _file_key(kind, file) if CACHE_ENABLED and pa is not None else None
+    if key is None:
+        return parse(file)
+
+    path = os.path.join(cache_dir, key + '.arrow')
+    cached = _load(path)
+    if cached is not None:
+        return cached
+
+    vessel_info, frame = parse(file)
+    try:
+        _store(path, vessel_info, frame)
+        evict(cache_dir)
+    except (OSError, pa.ArrowException):
+        pass  # A read-only or full disk must never break parsing
+    return vessel_info, frame
+
+
+def evict(cache_dir=None, max_bytes=None, max_age=None):
+    cache_dir = cache_dir or CACHE_DIR or DEFAULT_CACHE_DIR
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    max_age = MAX_CACHE_AGE if max_age is None else max_age
+    now = time.time()
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if not entry.name.endswith('.arrow'):
+            continue
+        stat = entry.stat()
+        if now - stat.st_mtime > max_age:
+            _remove(entry.path)
+        else:
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    # Least recently used first, hits refresh the mtime
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+
+
+def _file_key(kind, file):
+    if isinstance(file, (str, os.PathLike)):
+        try:
+            with open(file, 'rb') as source:
+                return _file_key(kind, source)
+        except OSError:
+            return None
+    try:
+        if not file.seekable():
+            return None  # The bytes can only be read once
+        position = file.tell()
+        digest = hashlib.sha256(f'{kind}:{PARSER_VERSION}:'.encode())
+        while True:
+            chunk = file.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk.encode() if isinstance(chunk, str) else chunk)
+        file.seek(position)
+    except (AttributeError, OSError, ValueError):
+        return None
+    return digest.hexdigest()
+
+
+def _load(path):
+    try:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        os.utime(path)
+    except (OSError, pa.ArrowException):
+        return None
+    vessel_info = json.loads(table.schema.metadata.get(b'vessel_info', b'{}'))
+    # Copy out of the mapping so callers get ordinary writable frames
+    return vessel_info, table.to_pandas()
+
+
+def _store(path, vessel_info, frame):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'vessel_info'] = json.dumps(vessel_info).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Write then rename, so concurrent readers never see a partial entry
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, path)
+    except BaseException:
+        _remove(temp_path)
+        raise
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -1,110 +1,181 @@
+import numpy as np
 import pandas as pd
+from array import array
 from datetime import datetime
+from edifact import component, message_parser
+from parse_cache import parse_cached
 
-def parse_baplie(file):
-    vessel_info = {}
-    container_data = []
-    port_names = {
-        'BEANR': 'Antwerp', 'FRLEH': 'Le Havre'  # Example mapping, extend as needed
+DIMENSION_COLUMNS = ('Weight', 'Length', 'Width', 'Height')
+
+
+class ContainerColumns:
+    # Typed column buffers filled segment by segment, one row per EQD
+    def __init__(self, categorical=(), numeric=DIMENSION_COLUMNS, text=(), default=0.0):
+        self.order = list(categorical) + list(numeric) + list(text)
+        self.codes = {name: array('i') for name in categorical}
+        self.categories = {name: {} for name in categorical}
+        self.numeric = {name: array('d') for name in numeric}
+        self.text = {name: [] for name in text}
+        self.default = default
+        self.size = 0
+
+    def append(self, **values):
+        for name, codes in self.codes.items():
+            value = values.get(name, '')
+            categories = self.categories[name]
+            code = categories.get(value)
+            if code is None:
+                code = categories[value] = len(categories)
+            codes.append(code)
+        for name, column in self.numeric.items():
+            column.append(values.get(name, self.default))
+        for name, column in self.text.items():
+            column.append(values.get(name, ''))
+        self.size += 1
+
+    def set(self, name, value):
+        # Measurements always belong to the most recent EQD
+        if self.size:
+            self.numeric[name][-1] = value
+
+    def to_frame(self):
+        data = {}
+        for name in self.order:
+            if name in self.codes:
+                codes = np.frombuffer(self.codes[name], dtype=np.intc)
+                data[name] = pd.Categorical.from_codes(codes, categories=list(self.categories[name]))
+            elif name in self.numeric:
+                data[name] = np.frombuffer(self.numeric[name], dtype=np.float64)
+            else:
+                data[name] = self.text[name]
+        return pd.DataFrame(data, columns=self.order, copy=False)
+
+
+def decode_stowage_positions(locations):
+    """Split ISO 9711 BBBRRTT stowage positions into int16 Bay/Row/Tier and a Deck flag.
+
+    Works on the whole Location column at once; positions that can't be
+    decoded get 0 for bay, row and tier.
+    """
+    position = pd.Series(locations, copy=False).astype(str).str.split(':', n=1).str[0].str.strip()
+    valid = position.str.fullmatch(r'\d{6,7}').fillna(False).astype(bool)
+    numbers = pd.to_numeric(position.where(valid), errors='coerce').fillna(0).to_numpy(dtype=np.int32)
+    tier = (numbers % 100).astype(np.int16)
+    return {
+        'Bay': (numbers // 10000).astype(np.int16),
+        'Row': (numbers // 100 % 100).astype(np.int16),
+        'Tier': tier,
+        'Deck': tier >= 80,  # Deck tiers are numbered from 80 upwards
     }
-    content = file.read().decode('utf-8')
-    current_container = None  # Set to None initially
-
-    for line in content.splitlines():
-        line = line.strip()
-        if line.startswith('TDT'):
-           
-            elements = line.split('+')
-           
-            vessel_info = {
-                'Vessel Number': elements[2],
-                'Carrier': elements[4],
-                'Vessel Name': elements[7].split(':')[-1]
-            }
-        elif line.startswith('LOC+5'):
-            port_code = line.split('+')[2]
-            vessel_info['From Port'] = port_names.get(port_code, port_code)
-        elif line.startswith('LOC+61'):
-            port_code = line.split('+')[2]
-            vessel_info['To Port'] = port_names.get(port_code, port_code)
-        elif line.startswith('DTM+136'):
-            print(f"startdate", line.split(':')[1])
-            vessel_info['Start Date'] = convert_to_date(line.split(':')[1])
-        elif line.startswith('DTM+178'):
-            vessel_info['Planned Arrival Date'] = convert_to_date(line.split(':')[1])
-        elif line.startswith('EQD'):
-            if current_container:
-                container_data.append(current_container)
-            elements = line.split('+')
-            current_container = {'ContainerNumber': elements[2], 'Type': elements[3], 'Weight': 0, 'Length': 0, 'Width': 0, 'Height': 0, 'Location': ''}
-        elif line.startswith('LOC+147'):
-            container_location = line.split('+')[2]
-            if current_container is not None:
-                current_container['Location'] = container_location
-        elif line.startswith('MEA+AAE+AET+KGM'):
-            elements = line.split('+')
-            weight_str = elements[3].split(':')[1].replace("'", "")
-            if current_container is not None:
-                try:
-                    current_container['Weight'] = float(weight_str) if weight_str else 0
-                except ValueError:
-                    current_container['Weight'] = 0
-        elif line.startswith('DIM+13'):
-            dimensions = line.split('+')[2].split(':')
-          
-            if len(dimensions) >= 4 and current_container is not None:
-                
-                try:
-                    current_container['Length'] = float(dimensions[2]) if dimensions[2] else 0
-                    current_container['Width'] = float(dimensions[3]) if dimensions[3] else 0
-                    current_container['Height'] = float(dimensions[4])
-                    
-
-                except ValueError:
-                    current_container['Length'] = 0
-                    current_container['Width'] = 0
-                    current_container['Height'] = 0
-    if current_container:
-        container_data.append(current_container)
-    return vessel_info, pd.DataFrame(container_data)
+
+
+class ParseState:
+    def __init__(self, columns):
+        self.vessel_info = {}
+        self.columns = columns
+        self.location = ''  # LOC+147 opens the container group, EQD follows it
+
+
+port_names = {
+    'BEANR': 'Antwerp', 'FRLEH': 'Le Havre'  # Example mapping, extend as needed
+}
+
+BAPLIE = message_parser('BAPLIE')
+COPRAR = message_parser('COPRAR')
+
+
+@BAPLIE.handler('TDT')
+@COPRAR.handler('TDT')
+def _transport(state, elements):
+    state.vessel_info = {
+        'Vessel Number': component(elements, 1),
+        'Carrier': component(elements, 4),
+        'Vessel Name': elements[6][-1] if len(elements) > 6 else ''
+    }
+
+@BAPLIE.handler('LOC', '5')
+def _from_port(state, elements):
+    port_code = component(elements, 1)
+    state.vessel_info['From Port'] = port_names.get(port_code, port_code)
+
+@BAPLIE.handler('LOC', '61')
+def _to_port(state, elements):
+    port_code = component(elements, 1)
+    state.vessel_info['To Port'] = port_names.get(port_code, port_code)
+
+@BAPLIE.handler('DTM', '136')
+def _start_date(state, elements):
+    state.vessel_info['Start Date'] = convert_to_date(component(elements, 0, 1))
+
+@BAPLIE.handler('DTM', '178')
+def _arrival_date(state, elements):
+    state.vessel_info['Planned Arrival Date'] = convert_to_date(component(elements, 0, 1))
+
+@BAPLIE.handler('LOC', '147')
+def _stowage_location(state, elements):
+    state.location = ':'.join(elements[1]) if len(elements) > 1 else ''
+
+@BAPLIE.handler('EQD')
+def _baplie_equipment(state, elements):
+    state.columns.append(ContainerNumber=component(elements, 1), Type=component(elements, 2), Location=state.location)
+    state.location = ''
+
+@BAPLIE.handler('MEA', 'AAE')
+def _baplie_weight(state, elements):
+    if component(elements, 1) == 'AET' and component(elements, 2) == 'KGM':
+        state.columns.set('Weight', to_float(component(elements, 2, 1)))
+
+@BAPLIE.handler('DIM', '13')
+@COPRAR.handler('DIM', '13')
+def _dimensions(state, elements):
+    state.columns.set('Length', to_float(component(elements, 1, 1)))
+    state.columns.set('Width', to_float(component(elements, 1, 2)))
+    state.columns.set('Height', to_float(component(elements, 1, 3)))
+
+@COPRAR.handler('EQD')
+def _coprar_equipment(state, elements):
+    state.columns.append(ContainerNumber=component(elements, 1) or 'UNKNOWN')
+
+@COPRAR.handler('MEA')
+def _coprar_weight(state, elements):
+    if component(elements, 2) == 'KGM':
+        state.columns.set('Weight', to_float(component(elements, 2, 1)))
+
+
+def parse_baplie(file):
+    return parse_cached('BAPLIE', file, _parse_baplie)
+
+def _parse_baplie(file):
+    columns = ContainerColumns(categorical=('ContainerNumber', 'Type'), text=('Location',))
+    state = BAPLIE.parse(file, ParseState(columns))
+    frame = columns.to_frame()
+    for name, values in decode_stowage_positions(frame['Location']).items():
+        frame[name] = values
+    return state.vessel_info, frame
 
 def convert_to_date(timestamp):
     try:
         return datetime.strptime(timestamp, '%Y%m%d%H%M').strftime('%Y-%m-%d %H:%M')
     except ValueError:
         return timestamp
+def to_float(value):
+    try:
+        # EDIFACT allows either decimal mark, see UNA
+        return float(value.replace(',', '.')) if value else 0
+    except ValueError:
+        return 0
+
 def parse_coprar(file):
-    data = []
-    current_container = {}
-    content = file.read().decode('utf-8')
-    for line in content.splitlines():
-        line = line.strip()
-        if line.startswith('EQD'):
-            if current_container:
-                data.append(current_container)
-            elements = line.split('+')
-            current_container = {'ContainerNumber': elements[2] if len(elements) > 2 else 'UNKNOWN'}
-        elif line.startswith('MEA') and 'KGM' in line:
-            elements = line.split('+')
-            weight_str = elements[3].split(':')[1].replace("'", "")
-            try:
-                current_container['Weight'] = float(weight_str) if weight_str else 0
-            except ValueError:
-                current_container['Weight'] = 0
-        elif line.startswith('DIM+13'):
-            dimensions = line.split('+')[2].split(':')
-            if len(dimensions) >= 4:
-                try:
-                    current_container['Length'] = float(dimensions[2]) if dimensions[2] else 0
-                    current_container['Width'] = float(dimensions[3]) if dimensions[3] else 0
-                    current_container['Height'] = float(dimensions[4]) if dimensions[4] else 0
-                except ValueError:
-                    current_container['Length'] = 0
-                    current_container['Width'] = 0
-                    current_container['Height'] = 0
-    if current_container:
-        data.append(current_container)
-    return pd.DataFrame(data)
+    return parse_coprar_message(file)[1]
+
+def parse_coprar_message(file):
+    return parse_cached('COPRAR', file, _parse_coprar)
+
+def _parse_coprar(file):
+    # Missing measurements stay NaN so the BAPLIE values win when merging
+    columns = ContainerColumns(categorical=('ContainerNumber',), default=np.nan)
+    state = COPRAR.parse(file, ParseState(columns))
+    return state.vessel_info, columns.to_frame()
 
 def parse_equipment(file):
-    return pd.read_csv(file)
\ No newline at end of file
+    return parse_cached('EQUIPMENT', file, lambda file: ({}, pd.read_csv(file)))[1]
\ No newline at end of file
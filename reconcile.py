@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+MEASUREMENT_COLUMNS = ['Weight', 'Length', 'Width', 'Height']
+MISMATCH_COLUMNS = ['ContainerNumber', 'Field', 'BAPLIE', 'COPRAR', 'Difference']
+
+
+def reconcile_containers(baplie_data, coprar_data, tolerance=0.0):
+    """Fill BAPLIE measurements from COPRAR and report where the two disagree.
+
+    Returns one row per BAPLIE container with Weight/Length/Width/Height taken
+    from BAPLIE when it reports them and from COPRAR otherwise, plus a table of
+    containers whose reported values differ by more than tolerance.
+    """
+    positions = lookup_positions(baplie_data['ContainerNumber'], coprar_data['ContainerNumber'])
+    found = positions >= 0
+
+    container_details = baplie_data.copy()
+    mismatches = []
+    for field in MEASUREMENT_COLUMNS:
+        baplie_values = _values(baplie_data, field)
+        coprar_values = np.full(len(baplie_data), np.nan)
+        coprar_values[found] = _values(coprar_data, field)[positions[found]]
+
+        # BAPLIE leaves unreported measurements at 0
+        baplie_reported = ~np.isnan(baplie_values) & (baplie_values != 0)
+        coprar_reported = ~np.isnan(coprar_values) & (coprar_values != 0)
+        container_details[field] = np.where(baplie_reported | ~coprar_reported, baplie_values, coprar_values)
+
+        difference = baplie_values - coprar_values
+        differs = baplie_reported & coprar_reported & (np.abs(difference) > tolerance)
+        if differs.any():
+            mismatches.append(pd.DataFrame({
+                'ContainerNumber': baplie_data['ContainerNumber'].array[differs],
+                'Field': field,
+                'BAPLIE': baplie_values[differs],
+                'COPRAR': coprar_values[differs],
+                'Difference': difference[differs],
+            }))
+
+    if mismatches:
+        mismatches = pd.concat(mismatches, ignore_index=True)
+    else:
+        mismatches = pd.DataFrame(columns=MISMATCH_COLUMNS)
+    return container_details, mismatches
+
+
+def lookup_positions(keys, candidates):
+    """Row of candidates holding each key, the last one when repeated, or -1 when absent.
+
+    Both sides are joined through their categorical codes, so each distinct
+    container number is hashed at most once.
+    """
+    keys = _categorical(keys)
+    candidates = _categorical(candidates)
+
+    # Last row per candidate category, with a trailing -1 slot for missing codes
+    row_of_category = np.full(len(candidates.categories) + 1, -1)
+    reversed_codes = candidates.codes[::-1]
+    codes, first = np.unique(reversed_codes, return_index=True)
+    valid = codes >= 0
+    row_of_category[codes[valid]] = len(reversed_codes) - 1 - first[valid]
+
+    if keys.categories.equals(candidates.categories):
+        category_map = np.arange(len(keys.categories))
+    else:
+        category_map = candidates.categories.get_indexer(keys.categories)
+    category_map = np.append(category_map, -1)
+    return row_of_category[category_map[keys.codes]]
+
+
+def _categorical(values):
+    values = pd.Series(values, copy=False)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.array
+    return pd.Categorical(values)
+
+
+def _values(data, field):
+    if field not in data.columns:
+        return np.full(len(data), np.nan)
+    return data[field].to_numpy(dtype=np.float64, na_value=np.nan)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from discharge_cost import position_columns
+
+ROW_SPACING_METRES = 2.5  # Athwartships distance between neighbouring rows
+BAY_SPACING_METRES = 12.5  # Fore and aft distance between 40ft bays
+# Trim moments count a tenth as much as list, a ship is far stiffer in pitch than in roll
+TRIM_WEIGHT = 0.1
+
+
+class StabilityModel:
+    """Peak list and trim stress a discharge sequence puts on the vessel.
+
+    Each box contributes a heeling moment (weight times its offset from the
+    centreline, odd rows starboard, even rows port) and a trimming moment
+    (weight times its 40ft bay's offset from the middle of the stow). As
+    boxes leave, the remaining moments change. The stress of a sequence is
+    the largest |list| + TRIM_WEIGHT * |trim|, in tonne-metres, left on
+    board after any of its moves. The full stow before the first move is
+    left out: it is the same for every sequence, and whenever it was the
+    peak it made every sequence score alike. Balanced sequences alternate
+    sides instead of emptying one side first, and boxes that list the
+    vessel go early.
+    """
+
+    def __init__(self, data):
+        self.arrays = stability_arrays(data)
+
+    def __len__(self):
+        return len(self.arrays['list_moment'])
+
+    def score(self, sequences):
+        return stability_stress(self.arrays, sequences)
+
+
+def stability_arrays(data):
+    bay, row, _, forty_bay = position_columns(data)
+    weight = data['Weight'].to_numpy(dtype=np.float64, na_value=0) / 1000 if 'Weight' in data.columns else np.zeros(len(data))
+    known = bay > 0
+    offset = np.where(row % 2 == 1, (row + 1) // 2, -(row // 2)) * ROW_SPACING_METRES
+    middle = (forty_bay[known].min() + forty_bay[known].max()) / 2 if known.any() else 0.0
+    list_moment = np.where(known, weight * offset, 0.0)
+    trim_moment = np.where(known, weight * (forty_bay - middle) * BAY_SPACING_METRES, 0.0)
+    return {'list_moment': list_moment, 'trim_moment': trim_moment}
+
+
+def stability_stress(arrays, sequences):
+    """Peak stress in tonne-metres after each move, for every row of a population matrix."""
+    sequences = np.asarray(sequences, dtype=np.intp)
+    if sequences.ndim == 1:
+        sequences = sequences[None, :]
+    stress = np.zeros((len(sequences), sequences.shape[1]))
+    for name, scale in (('list_moment', 1.0), ('trim_moment', TRIM_WEIGHT)):
+        # Moment still on board after each discharge
+        moments = arrays[name]
+        stress += scale * np.abs(moments.sum() - np.cumsum(moments[sequences], axis=1))
+    return stress.max(axis=1, initial=0.0)
@@ -0,0 +1,183 @@
+import math
+import random
+import string
+
+import pandas as pd
+
+# Vessel layouts in 40ft bays; rows are counted across the ship
+LAYOUTS = {
+    'feeder': {'bays': 8, 'rows': 7, 'hold_tiers': 5, 'deck_tiers': 3},
+    'panamax': {'bays': 18, 'rows': 13, 'hold_tiers': 8, 'deck_tiers': 6},
+    'ultra': {'bays': 24, 'rows': 24, 'hold_tiers': 11, 'deck_tiers': 9},  # ~24,000 TEU
+}
+ISO_TYPES = {
+    20: ('22G1', 610.0, 244.0, 259.0),
+    40: ('45G1', 1219.0, 244.0, 290.0),
+}
+
+
+def generate_stowage_plan(n_containers, layout='ultra', forty_share=0.6, seed=0):
+    """Return a realistic stowage plan of n_containers as a DataFrame.
+
+    Stacks are filled bottom-up to random heights, 40ft stacks sit in even
+    bays and 20ft stacks in the odd bays either side. The layout is extended
+    with extra bays when it can't hold n_containers.
+    """
+    rng = random.Random(seed)
+    layout = LAYOUTS[layout] if isinstance(layout, str) else layout
+    hold_tiers = [2 * t + 2 for t in range(layout['hold_tiers'])]
+    deck_tiers = [2 * t + 82 for t in range(layout['deck_tiers'])]
+    rows = _row_numbers(layout['rows'])
+
+    # Expect stacks to be about three quarters full on average, 20ft stacks hold two boxes per tier
+    boxes_per_bay = len(rows) * (len(hold_tiers) + len(deck_tiers)) * (2 - forty_share)
+    bays = max(layout['bays'], math.ceil(n_containers / (0.75 * boxes_per_bay)))
+    if 4 * bays > 999:
+        raise ValueError(f"{n_containers} containers don't fit a three-digit bay numbering, use a larger layout")
+
+    stacks = []
+    for bay_index in range(bays):
+        for row in rows:
+            for tiers in (hold_tiers, deck_tiers):
+                size = 40 if rng.random() < forty_share else 20
+                bay_numbers = [4 * bay_index + 2] if size == 40 else [4 * bay_index + 1, 4 * bay_index + 3]
+                stacks.extend((bay, row, tiers, size) for bay in bay_numbers)
+    rng.shuffle(stacks)
+
+    heights = [0] * len(stacks)
+    remaining = n_containers
+    for index, (_, _, tiers, _) in enumerate(stacks):
+        if remaining <= 0:
+            break
+        heights[index] = min(rng.randint(len(tiers) // 2, len(tiers)), remaining)
+        remaining -= heights[index]
+    # Top stacks up when the random heights left containers over
+    for index, (_, _, tiers, _) in enumerate(stacks):
+        if remaining <= 0:
+            break
+        extra = min(len(tiers) - heights[index], remaining)
+        heights[index] += extra
+        remaining -= extra
+
+    records = sorted(
+        (bay, row, tier, size)
+        for (bay, row, tiers, size), height in zip(stacks, heights)
+        for tier in tiers[:height]
+    )
+
+    containers = []
+    for bay, row, tier, size in records:
+        iso_type, length, width, height = ISO_TYPES[size]
+        containers.append({
+            'ContainerNumber': container_number(rng),
+            'Type': iso_type,
+            'Weight': round(rng.uniform(2200, 30480), -1),
+            'Length': length,
+            'Width': width,
+            'Height': height,
+            'Location': f'{bay:03d}{row:02d}{tier:02d}',
+            'Bay': bay,
+            'Row': row,
+            'Tier': tier,
+        })
+    return pd.DataFrame(containers)
+
+
+def container_number(rng):
+    # Owner code, equipment category U, serial number and ISO 6346 check digit
+    owner = ''.join(rng.choice(string.ascii_uppercase) for _ in range(3)) + 'U'
+    serial = f'{rng.randrange(1000000):06d}'
+    return owner + serial + str(_check_digit(owner + serial))
+
+
+def write_baplie(plan, path, vessel_name='SYNTHETIC', voyage='001E', one_line=False):
+    segments = _header('BAPLIE', vessel_name, voyage)
+    segments += ['LOC+5+BEANR', 'DTM+136:202306301048:203', 'LOC+61+FRLEH', 'DTM+178:202306301200:203', 'UNS+D']
+    for container in plan.itertuples(index=False):
+        segments += [
+            f'LOC+147+{container.Location}:9711:5',
+            f'EQD+CN+{container.ContainerNumber}:6346:5+{container.Type}:6346:5+++5',
+            'NAD+CF+HSD:LINES:306',
+            f'MEA+AAE+AET+KGM:{container.Weight:g}',
+        ]
+    _write_message(path, segments, one_line)
+
+
+def write_coprar(plan, path, vessel_name='SYNTHETIC', voyage='001E', mismatch_rate=0.01, seed=0, one_line=False):
+    # A small share of VGM weights disagrees with the BAPLIE, as in real message pairs
+    rng = random.Random(seed)
+    segments = _header('COPRAR', vessel_name, voyage)
+    for container in plan.itertuples(index=False):
+        weight = container.Weight
+        if rng.random() < mismatch_rate:
+            weight += rng.choice((-1, 1)) * round(rng.uniform(100, 2000), -1)
+        segments += [
+            f'EQD+CN+{container.ContainerNumber}:6346:5+{container.Type}:6346:5+++5',
+            'LOC+7+PlaceOfPositioning:139:6',
+            f'MEA+AAE+VGM+KGM:{weight:g}',
+            f'DIM+13+CMT:{container.Length:g}:{container.Width:g}:{container.Height:g}',
+        ]
+    _write_message(path, segments, one_line)
+
+
+def write_equipment(plan, path):
+    # Roughly one crane per six bays, supported by horizontal transport
+    cranes = max(2, plan['Bay'].nunique() // 6)
+    equipment = [('Crane', 40)] * cranes + [('ReachStacker', 25)] * cranes + [('Forklift', 10)] * cranes
+    frame = pd.DataFrame(equipment, columns=['Type', 'Capacity'])
+    frame.insert(0, 'EquipmentID', range(1, len(frame) + 1))
+    frame.to_csv(path, index=False)
+
+
+def write_dataset(directory, n_containers, layout='ultra', seed=0, one_line=False):
+    plan = generate_stowage_plan(n_containers, layout=layout, seed=seed)
+    paths = {
+        'baplie': f'{directory}/baplie_{layout}_{n_containers}.edi',
+        'coprar': f'{directory}/coprar_{layout}_{n_containers}.edi',
+        'equipment': f'{directory}/equipment_{layout}_{n_containers}.csv',
+    }
+    write_baplie(plan, paths['baplie'], one_line=one_line)
+    write_coprar(plan, paths['coprar'], seed=seed, one_line=one_line)
+    write_equipment(plan, paths['equipment'])
+    return plan, paths
+
+
+def _row_numbers(rows):
+    # Centre row 00 on odd widths, then starboard odd and port even outwards
+    numbers = [0] if rows % 2 else []
+    for offset in range(1, rows // 2 + 1):
+        numbers += [2 * offset - 1, 2 * offset]
+    return numbers
+
+
+def _check_digit(code):
+    values = []
+    value = 10
+    for char in string.ascii_uppercase:
+        if value % 11 == 0:
+            value += 1
+        values.append(value)
+        value += 1
+    letters = dict(zip(string.ascii_uppercase, values))
+    total = sum((letters[char] if char.isalpha() else int(char)) * 2 ** i for i, char in enumerate(code))
+    return total % 11 % 10
+
+
+def _header(message_type, vessel_name, voyage):
+    return [
+        'UNB+UNOA:2+SID+RID+20230630:1159+I-SYN/1+++++T01',
+        f'UNH+M-SYN/1+{message_type}:D:13B:UN:SMDG31',
+        'BGM+659::LOADONLY+M-SYN/1++38',
+        'DTM+137:202306300959:203',
+        f'TDT+20+{voyage}+++HLC:LINES:306++9354351:11:{vessel_name}',
+        f'RFF+VON:{voyage}',
+    ]
+
+
+def _write_message(path, segments, one_line):
+    segments.append(f'UNT+{len(segments):d}+M-SYN/1')
+    segments.append('UNZ+1+I-SYN/1')
+    separator = "'" if one_line else "'\n"
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("UNA:+.? '" + ('' if one_line else '\n'))
+        file.write(separator.join(segments) + "'\n")
@@ -0,0 +1,74 @@
+import pandas as pd
+
+from container_store import ContainerStore
+from parsers import decode_stowage_positions
+
+
+def plan(*containers):
+    # (ContainerNumber, Location, Weight) triples as a decoded BAPLIE frame
+    frame = pd.DataFrame(containers, columns=['ContainerNumber', 'Location', 'Weight'])
+    frame['Type'] = '22G1'
+    for name, values in decode_stowage_positions(frame['Location']).items():
+        frame[name] = values
+    return frame
+
+
+def assert_indexed(store):
+    assert len(store.rows) == len(store)
+    for number, row in store.rows.items():
+        assert store.get(number)['ContainerNumber'] == number
+        assert store.data['ContainerNumber'].iloc[row] == number
+    for (bay, row, tier), number in store.slots.items():
+        assert tuple(store.get(number)[['Bay', 'Row', 'Tier']]) == (bay, row, tier)
+
+
+def test_first_plan_adds_everything():
+    store = ContainerStore()
+    changes = store.apply(plan(('AAAU0000001', '0010102', 20000), ('BBBU0000002', '0010104', 15000)))
+    assert sorted(changes.added) == ['AAAU0000001', 'BBBU0000002']
+    assert changes.stacks == {(1, 1)}
+    assert store.at(1, 1, 4) == 'BBBU0000002'
+    assert store.get('CCCU0000003') is None
+    assert_indexed(store)
+
+
+def test_add_move_remove_and_update():
+    store = ContainerStore()
+    store.apply(plan(('AAAU0000001', '0010102', 20000), ('BBBU0000002', '0010104', 15000), ('CCCU0000003', '0030102', 9000)))
+    # Reordered resend: A moves to bay 5, B is gone, C gets heavier, D arrives in B's old slot
+    changes = store.apply(plan(('DDDU0000004', '0010104', 7000), ('CCCU0000003', '0030102', 9500), ('AAAU0000001', '0050102', 20000)))
+    assert changes.summary() == {'Added': 1, 'Removed': 1, 'Moved': 1, 'Updated': 1}
+    assert changes.added == ['DDDU0000004']
+    assert changes.removed == ['BBBU0000002']
+    assert changes.moved == ['AAAU0000001']
+    assert changes.updated == ['CCCU0000003']
+    assert changes.stacks == {(1, 1), (5, 1), (3, 1)}
+    assert store.at(1, 1, 2) is None
+    assert store.at(1, 1, 4) == 'DDDU0000004'
+    assert store.at(5, 1, 2) == 'AAAU0000001'
+    assert store.get('BBBU0000002') is None
+    assert store.get('CCCU0000003')['Weight'] == 9500
+    assert store.version == 2
+    assert_indexed(store)
+
+
+def test_move_into_occupied_slot():
+    store = ContainerStore()
+    store.apply(plan(('AAAU0000001', '0010102', 20000), ('BBBU0000002', '0010104', 15000), ('CCCU0000003', '0030102', 9000)))
+    # A and B swap tiers, C moves into A's old slot, which A leaves in the same resend
+    changes = store.apply(plan(('AAAU0000001', '0010104', 20000), ('BBBU0000002', '0030102', 15000), ('CCCU0000003', '0010102', 9000)))
+    assert sorted(changes.moved) == ['AAAU0000001', 'BBBU0000002', 'CCCU0000003']
+    assert store.at(1, 1, 2) == 'CCCU0000003'
+    assert store.at(1, 1, 4) == 'AAAU0000001'
+    assert store.at(3, 1, 2) == 'BBBU0000002'
+    assert_indexed(store)
+
+
+def test_unchanged_resend_is_empty():
+    store = ContainerStore()
+    first = plan(('AAAU0000001', '0010102', 20000), ('BBBU0000002', '0010104', 15000))
+    store.apply(first)
+    changes = store.apply(first.iloc[::-1])
+    assert changes.is_empty()
+    assert changes.stacks == set()
+    assert_indexed(store)
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crane_schedule import SCHEDULE_COLUMNS, schedule_cranes
+
+EQUIPMENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Source', 'eqipment.csv')
+
+
+def plan(weights, bays=None):
+    count = len(weights)
+    bays = bays or [1 + 4 * (index % 3) for index in range(count)]
+    return pd.DataFrame({
+        'ContainerNumber': [f'TSTU{index:07d}' for index in range(count)],
+        'Bay': bays,
+        'Row': [1] * count,
+        'Tier': [2] * count,
+        'Weight': [weight * 1000.0 for weight in weights],
+    })
+
+
+def test_boxes_beyond_equipment_are_unassigned():
+    # Cranes lift up to 40 t but landside units only carry 25 t
+    equipment = pd.read_csv(EQUIPMENT_FILE)
+    data = plan([10, 30, 45, 24, 12])
+    schedule, makespan, unassigned = schedule_cranes(data, equipment)
+    assert sorted(unassigned) == [1, 2]
+
+    assert list(schedule.columns) == SCHEDULE_COLUMNS
+    assert len(schedule) == len(data)
+    infeasible = schedule[schedule['ContainerNumber'].isin(data['ContainerNumber'].iloc[[1, 2]])]
+    assert infeasible['Crane'].isna().all()
+    assert infeasible['Transport'].isna().all()
+    assert infeasible['Finish'].isna().all()
+
+    scheduled = schedule[schedule['Crane'].notna()]
+    assert sorted(scheduled['ContainerNumber']) == sorted(data['ContainerNumber'].iloc[[0, 3, 4]])
+    assert scheduled['Transport'].notna().all()
+    capacity = equipment.set_index('EquipmentID')['Capacity']
+    assert (scheduled['Weight'].to_numpy() / 1000 <= capacity[scheduled['Transport']].to_numpy()).all()
+    assert makespan == pytest.approx(scheduled['Finish'].max())
+
+
+def test_all_feasible():
+    equipment = pd.read_csv(EQUIPMENT_FILE)
+    data = plan([10, 20, 15, 25, 5, 8])
+    schedule, makespan, unassigned = schedule_cranes(data, equipment)
+    assert unassigned == []
+    assert schedule['Crane'].notna().all()
+    assert (schedule['Finish'] > schedule['Start']).all()
+    assert makespan > 0
+
+
+def test_crane_only_equipment_list():
+    # Without landside units the schedule times the cranes alone
+    equipment = pd.DataFrame({'EquipmentID': [1, 2], 'Type': ['Crane', 'Crane'], 'Capacity': [40, 40]})
+    schedule, _, unassigned = schedule_cranes(plan([10, 30, 45]), equipment)
+    assert unassigned == [2]
+    assert schedule['Transport'].isna().all()
+    assert schedule['Crane'].notna().sum() == 2
+
+
+def test_no_cranes():
+    equipment = pd.DataFrame({'EquipmentID': [1], 'Type': ['Forklift'], 'Capacity': [10]})
+    with pytest.raises(ValueError):
+        schedule_cranes(plan([5]), equipment)
+
+
+def test_sequence_order_kept_within_hatch():
+    equipment = pd.read_csv(EQUIPMENT_FILE)
+    data = plan([10] * 6, bays=[1] * 6)
+    sequence = np.array([3, 1, 5, 0, 2, 4])
+    schedule, _, _ = schedule_cranes(data, equipment, sequence)
+    order = schedule.sort_values('Start')['ContainerNumber'].tolist()
+    assert order == data['ContainerNumber'].iloc[sequence].tolist()
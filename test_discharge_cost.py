@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from discharge_cost import (BAY_CHANGE_SECONDS, GANTRY_SECONDS_PER_BAY, RESTOW_SECONDS, DischargeCostModel,
+                            restowed)
+
+
+@pytest.fixture
+def stack():
+    # One row of 40ft bay 02: 20ft boxes in bays 01 and 03, a 40ft box across both on top,
+    # a deck box over the fore half, and a loose box in the next 40ft bay
+    return pd.DataFrame({
+        'Bay': [1, 3, 2, 1, 5],
+        'Row': [1, 1, 1, 1, 1],
+        'Tier': [2, 2, 4, 82, 2],
+    })
+
+
+# A box is restowed once however many boxes below it leave first
+@pytest.mark.parametrize('sequence, restows', [
+    ([3, 2, 0, 1, 4], 0),
+    ([2, 3, 0, 1, 4], 1),  # deck box lifted off the 40ft box
+    ([3, 1, 2, 0, 4], 1),  # 40ft box lifted off the aft 20ft box
+    ([3, 0, 2, 1, 4], 1),  # 40ft box lifted off the fore 20ft box
+    ([0, 1, 2, 3, 4], 2),  # 40ft and deck box, the loose box in the next bay is never involved
+    ([4, 0, 1, 2, 3], 2),
+])
+def test_restows(stack, sequence, restows):
+    model = DischargeCostModel(stack)
+    assert model.breakdown(sequence)['Restows'] == restows
+    assert restowed(model.arrays, sequence).sum() == restows
+
+
+def test_restowed_flags(stack):
+    model = DischargeCostModel(stack)
+    assert restowed(model.arrays, [2, 3, 0, 1, 4]).tolist() == [False, False, False, True, False]
+
+
+def test_score(stack):
+    model = DischargeCostModel(stack)
+    sequences = np.array([[3, 2, 0, 1, 4], [0, 1, 2, 3, 4]])
+    # Bays 01 02 01 03 05: one 40ft bay travelled, four bay changes
+    assert model.breakdown(sequences[0]) == {'Restows': 0, 'Bays Travelled': 1, 'Bay Changes': 4}
+    expected = [GANTRY_SECONDS_PER_BAY + 4 * BAY_CHANGE_SECONDS,
+                2 * RESTOW_SECONDS + GANTRY_SECONDS_PER_BAY + 4 * BAY_CHANGE_SECONDS]
+    assert model.score(sequences).tolist() == pytest.approx(expected)
+
+
+def test_undecoded_positions_never_block():
+    data = pd.DataFrame({'Bay': [0, 1, 0], 'Row': [0, 1, 0], 'Tier': [0, 2, 0]})
+    model = DischargeCostModel(data)
+    assert model.breakdown([0, 1, 2])['Restows'] == 0
+    assert model.breakdown([2, 1, 0])['Restows'] == 0
@@ -0,0 +1,139 @@
+import io
+import os
+
+import pytest
+
+from edifact import MessageParser, map_segments, read_message_type, read_segments, split_segment
+from parsers import parse_baplie
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Source')
+MESSAGES = [os.path.join(SOURCE, 'baplie.txt'), os.path.join(SOURCE, 'coprar.txt')]
+
+
+def stream_segments(data, chunk_size=1 << 20):
+    return list(read_segments(io.BytesIO(data), chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize('path', MESSAGES)
+@pytest.mark.parametrize('chunk_size', [1, 7])
+def test_chunked_read_matches_whole_file(path, chunk_size):
+    with open(path, 'rb') as file:
+        data = file.read()
+    whole = stream_segments(data)
+    assert whole[0][0] == 'UNB'
+    assert stream_segments(data, chunk_size) == whole
+
+
+@pytest.mark.parametrize('path', MESSAGES)
+def test_mapped_file_matches_stream(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    assert list(map_segments(path)) == stream_segments(data)
+
+
+@pytest.mark.parametrize('data', [
+    b"UNH+1+BAPLIE'LOC+147+0200688:9711:1'EQD+CN+SUDU1234561'",  # Terminator is the last byte
+    b"UNH+1+BAPLIE'LOC+147+0200688:9711:1'EQD+CN+SUDU1234561",  # Unterminated last segment
+    b"\n  UNH+1+BAPLIE'\r\nFTX+AAA+++O?'NEIL ?+ CO??'\r\nEQD+CN+SUDU1234561'\r\n",
+    b"UNA*|.! ~UNH|1|BAPLIE*D~\nFTX|A!~B!|C*D~",
+    "UNH+1+BAPLIE'FTX+AAA+++Café €5'".encode(),
+    b"'",
+    b" \n",
+])
+def test_mapped_bytes_match_stream(tmp_path, data):
+    path = tmp_path / 'message.edi'
+    path.write_bytes(data)
+    assert list(map_segments(path)) == stream_segments(data)
+
+
+def test_mapped_empty_file(tmp_path):
+    path = tmp_path / 'empty.edi'
+    path.write_bytes(b'')
+    assert list(map_segments(path)) == []
+    assert read_message_type(path) is None
+
+
+def test_mapped_tag_filter():
+    segments = list(map_segments(MESSAGES[0], {b'LOC', b'EQD'}))
+    assert {tag for tag, _ in segments} == {'LOC', 'EQD'}
+    assert segments == [segment for segment in map_segments(MESSAGES[0]) if segment[0] in ('LOC', 'EQD')]
+    assert read_message_type(MESSAGES[0]) == 'BAPLIE'
+
+
+def test_text_stream_matches_bytes():
+    with open(MESSAGES[0], 'rb') as file:
+        data = file.read()
+    assert list(read_segments(io.StringIO(data.decode()), chunk_size=7)) == stream_segments(data)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 1 << 16])
+def test_utf8_split_across_chunks(chunk_size):
+    data = "UNH+1+BAPLIE'FTX+AAA+++Café €5'UNT+2+1'".encode()
+    assert stream_segments(data, chunk_size) == [
+        ('UNH', [['1'], ['BAPLIE']]),
+        ('FTX', [['AAA'], [''], [''], ['Café €5']]),
+        ('UNT', [['2'], ['1']]),
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1 << 16])
+def test_release_character(chunk_size):
+    data = b"FTX+AAA+++O?'NEIL ?+ CO?:LTD??'UNT+2+1'"
+    assert stream_segments(data, chunk_size) == [
+        ('FTX', [['AAA'], [''], [''], ["O'NEIL + CO:LTD?"]]),
+        ('UNT', [['2'], ['1']]),
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1 << 16])
+def test_custom_service_characters(chunk_size):
+    # Component *, element |, release !, terminator ~
+    data = b"UNA*|.! ~UNH|1|BAPLIE*D~\nFTX|A!~B!|C*D~LOC|147|0200688*9711*1"
+    assert stream_segments(data, chunk_size) == [
+        ('UNH', [['1'], ['BAPLIE', 'D']]),
+        ('FTX', [['A~B|C', 'D']]),
+        ('LOC', [['147'], ['0200688', '9711', '1']]),  # Unterminated last segment
+    ]
+
+
+def test_segments_split_over_lines_and_packed():
+    packed = b"UNH+1+BAPLIE'LOC+147+0200688:9711:1'EQD+CN+SUDU1234561'"
+    split = b"  UNH+1+BAPLIE'\r\nLOC+147+\r\n0200688:9711:1'\nEQD+CN+SUDU1234561'\n"
+    assert stream_segments(split) == stream_segments(packed)
+
+
+def test_split_segment():
+    assert split_segment('DIM+13+CMT:1219:244:290') == ('DIM', [['13'], ['CMT', '1219', '244', '290']])
+    assert split_segment('UNS') == ('UNS', [])
+    assert split_segment("FTX+A?+B", release=None) == ('FTX', [['A?'], ['B']])
+
+
+def test_message_parser_dispatches_on_qualifier():
+    parser = MessageParser('TEST')
+    seen = []
+
+    @parser.handler('LOC', '147')
+    def stowage(state, elements):
+        seen.append(('stowage', elements[1][0]))
+
+    @parser.handler('LOC')
+    def other(state, elements):
+        seen.append(('other', elements[0][0]))
+
+    data = b"LOC+5+BEANR'LOC+147+0200688'DTM+136:202306301048'LOC+61+FRLEH'"
+    parser.parse(io.BytesIO(data), None)
+    assert seen == [('other', '5'), ('stowage', '0200688'), ('other', '61')]
+
+
+def test_stowage_location_and_dimensions_attach_to_following_equipment():
+    data = (b"UNH+1+BAPLIE:D:13B:UN:SMDG31'"
+            b"LOC+147+0200688:9711:1'EQD+CN+SUDU1234561+42G1'MEA+AAE+AET+KGM:22000'DIM+13+CMT:1219:244:290'"
+            b"LOC+147+0010182:9711:1'EQD+CN+SUDU1234562+22G1'DIM+13+CMT:::259'"
+            b"EQD+CN+SUDU1234563+22G1'")
+    _, frame = parse_baplie(io.BytesIO(data))
+    assert frame['ContainerNumber'].tolist() == ['SUDU1234561', 'SUDU1234562', 'SUDU1234563']
+    assert frame['Location'].tolist() == ['0200688:9711:1', '0010182:9711:1', '']
+    assert frame['Weight'].tolist() == [22000.0, 0.0, 0.0]
+    # DIM+13 is unit:length:width:height
+    assert frame[['Length', 'Width', 'Height']].values.tolist() == [[1219, 244, 290], [0, 0, 259], [0, 0, 0]]
+    assert frame[['Bay', 'Row', 'Tier']].values.tolist() == [[20, 6, 88], [1, 1, 82], [0, 0, 0]]
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from fitness_cache import FitnessCache, permutation_keys
+
+
+def score(sequences):
+    # Order dependent, so different permutations get different fitness values
+    sequences = np.asarray(sequences)
+    return [(float(value),) for value in (sequences * np.arange(sequences.shape[1])).sum(axis=1)]
+
+
+def test_hits_misses_and_eviction():
+    cache = FitnessCache(maxsize=3)
+    population = np.array([[0, 1, 2], [2, 1, 0], [0, 1, 2], [1, 0, 2]])
+    assert cache.evaluate(population, score) == score(population)
+    assert cache.info() == (1, 3, 3, 3)  # The repeated row is a hit within the batch
+    assert cache.evaluate(population[:1], score) == score(population[:1])
+    assert cache.info().hits == 2
+    cache.evaluate(np.array([[1, 2, 0]]), score)
+    # [2, 1, 0] was least recently used
+    assert (b'', permutation_keys([[2, 1, 0]])[0]) not in cache.entries
+    assert len(cache.entries) == 3
+
+
+def test_context_separates_entries():
+    cache = FitnessCache()
+    cache.evaluate(np.array([[0, 1, 2]]), score, context=b'a')
+    cache.evaluate(np.array([[0, 1, 2]]), score, context=b'b')
+    assert cache.info().misses == 2
+
+
+class YieldingEntries(OrderedDict):
+    # Lets other threads run between a lookup and the LRU bump that follows it
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        time.sleep(0.0001)
+        return value
+
+
+def test_shared_between_threads():
+    # A small cache evicts constantly, two threads then race on the same keys
+    cache = FitnessCache(maxsize=8)
+    cache.entries = YieldingEntries()
+    base = np.random.default_rng(0).permuted(np.tile(np.arange(12), (20, 1)), axis=1)
+    errors = []
+    lookups = []
+
+    def run(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for _ in range(100):
+                batch = base[rng.integers(0, len(base), 12)]
+                assert cache.evaluate(batch, score) == score(batch)
+                lookups.append(len(batch))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    info = cache.info()
+    assert info.hits + info.misses == sum(lookups)
+    assert info.currsize <= 8
+
+
+@pytest.mark.parametrize('maxsize', [1, 100])
+def test_clear(maxsize):
+    cache = FitnessCache(maxsize=maxsize)
+    cache.evaluate(np.array([[0, 1], [1, 0]]), score)
+    cache.clear()
+    assert cache.info() == (0, 0, maxsize, 0)
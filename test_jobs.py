@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from fitness_cache import FitnessCache
+from genetic_algorithm import DischargeOptimizer
+from jobs import CANCELLED, DONE, FAILED, JobManager, input_key
+from synthetic import generate_stowage_plan
+
+
+def wait(job, timeout=60):
+    deadline = time.monotonic() + timeout
+    while job.active:
+        assert time.monotonic() < deadline, f'job still {job.status}'
+        time.sleep(0.01)
+
+
+def optimize(data, ngen, time_limit=None, callback=None):
+    with DischargeOptimizer(data, population_size=40, cache=FitnessCache()) as optimizer:
+        return optimizer.optimize(ngen=ngen, time_limit=time_limit, callback=callback)
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=2)
+    yield manager
+    manager.shutdown()
+
+
+def test_cancel_one_of_two_running_jobs(manager):
+    data = generate_stowage_plan(200, 'feeder', seed=5)
+    endless = manager.submit(input_key(data, mode='endless'), optimize, data, ngen=None, time_limit=600)
+    finite = manager.submit(input_key(data, mode='finite'), optimize, data, ngen=5)
+    while not endless.progress:
+        time.sleep(0.01)
+    manager.cancel(endless.key)
+    wait(endless)
+    wait(finite)
+
+    assert endless.status == CANCELLED
+    assert endless.result is None
+    assert finite.status == DONE
+    assert sorted(finite.result) == list(range(len(data)))
+    assert [record['gen'] for record in finite.progress] == list(range(6))
+
+
+def test_same_key_reuses_job(manager):
+    calls = []
+
+    def record(value, callback):
+        calls.append(value)
+        return value
+
+    first = manager.submit('key', record, 1)
+    wait(first)
+    assert manager.submit('key', record, 2) is first
+    assert first.result == 1
+    assert calls == [1]
+
+
+def test_failed_and_cancelled_jobs_are_replaced(manager):
+    def fail(callback):
+        raise ValueError('no cranes')
+
+    failed = manager.submit('key', fail)
+    wait(failed)
+    assert failed.status == FAILED
+    assert isinstance(failed.error, ValueError)
+    retried = manager.submit('key', lambda callback: 'ok')
+    assert retried is not failed
+    wait(retried)
+    assert retried.result == 'ok'
+
+
+def test_cancel_before_start():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    try:
+        blocking = manager.submit('blocking', lambda callback: release.wait(10))
+        queued = manager.submit('queued', lambda callback: 'ran')
+        manager.cancel('queued')
+        assert queued.status == CANCELLED
+        release.set()
+        wait(blocking)
+        assert blocking.status == DONE
+        assert queued.result is None
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_finished_jobs_evicted_oldest_first():
+    manager = JobManager(max_workers=1, max_jobs=2)
+    try:
+        jobs = [manager.submit(key, lambda callback: None) for key in 'abc']
+        for job in jobs:
+            wait(job)
+        manager.submit('d', lambda callback: None)
+        assert manager.get('a') is None
+        assert manager.get('d') is not None
+    finally:
+        manager.shutdown()
+
+
+def test_input_key():
+    data = generate_stowage_plan(50, 'feeder', seed=1)
+    assert input_key(data, mode='a', budget=1) == input_key(data.copy(), budget=1, mode='a')
+    assert input_key(data, mode='a') != input_key(data, mode='b')
+    changed = data.copy()
+    changed.loc[0, 'Weight'] += 1
+    assert input_key(changed, mode='a') != input_key(data, mode='a')
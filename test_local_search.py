@@ -0,0 +1,35 @@
+import random
+
+import numpy as np
+import pytest
+
+from discharge_cost import DischargeCostModel
+from genetic_algorithm import make_individual
+from local_search import LocalSearch, improve_best
+from synthetic import generate_stowage_plan
+
+
+@pytest.fixture(scope='module')
+def model():
+    return DischargeCostModel(generate_stowage_plan(300, 'feeder', seed=3))
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_delta_matches_rescore(model, seed):
+    random.seed(seed)
+    original = np.random.default_rng(seed).permutation(len(model))
+    improved, delta = LocalSearch(model).improve(original, moves=300)
+    assert sorted(improved.tolist()) == list(range(len(model)))
+    assert delta <= 0
+    assert model.score(improved)[0] - model.score(original)[0] == pytest.approx(delta)
+
+
+def test_improve_best_fitness_matches_rescore(model):
+    random.seed(0)
+    rng = np.random.default_rng(0)
+    individuals = [make_individual(rng.permutation(len(model))) for _ in range(8)]
+    for individual in individuals:
+        individual.fitness.values = (model.score(individual)[0],)
+    improve_best(individuals, LocalSearch(model), count=4, moves=300)
+    for individual in individuals:
+        assert individual.fitness.values[0] == pytest.approx(model.score(individual)[0])
@@ -0,0 +1,38 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import parse_cache
+
+pytest.importorskip('pyarrow')
+
+
+def counting_parse(calls):
+    def parse(file):
+        calls.append(file.read())
+        return {'Vessel Name': 'ANINA'}, pd.DataFrame({'ContainerNumber': ['SUDU1234561'], 'Weight': [22000.0]})
+    return parse
+
+
+def test_disabled_cache_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_cache, 'CACHE_ENABLED', False)
+    calls = []
+    for _ in range(2):
+        parse_cache.parse_cached('BAPLIE', io.BytesIO(b'UNH+1'), counting_parse(calls), cache_dir=str(tmp_path))
+    assert len(calls) == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_enabled_cache_serves_repeat_parse(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_cache, 'CACHE_ENABLED', True)
+    calls = []
+    first = parse_cache.parse_cached('BAPLIE', io.BytesIO(b'UNH+1'), counting_parse(calls), cache_dir=str(tmp_path))
+    second = parse_cache.parse_cached('BAPLIE', io.BytesIO(b'UNH+1'), counting_parse(calls), cache_dir=str(tmp_path))
+    assert len(calls) == 1
+    assert second[0] == first[0]
+    pd.testing.assert_frame_equal(second[1], first[1])
+    # Another message kind over the same bytes is a separate entry
+    parse_cache.parse_cached('COPRAR', io.BytesIO(b'UNH+1'), counting_parse(calls), cache_dir=str(tmp_path))
+    assert len(calls) == 2
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from parsers import decode_stowage_positions
+
+
+def decoded(locations):
+    return pd.DataFrame(decode_stowage_positions(locations))
+
+
+def test_iso_positions():
+    frame = decoded(pd.Series(['0200688:9711:1', '0010102', '010182', ' 0010102 ', '0200688:ZZZ']))
+    assert frame.values.tolist() == [
+        [20, 6, 88, True],   # Qualifiers after the colon are ignored
+        [1, 1, 2, False],
+        [1, 1, 82, True],    # Six digit BBRRTT
+        [1, 1, 2, False],
+        [20, 6, 88, True],
+    ]
+    assert frame.dtypes.tolist() == [np.int16, np.int16, np.int16, np.bool_]
+
+
+@pytest.mark.parametrize('location', ['12345', '99999999', '', 'B020R06T88', '02OO688', None, np.nan, pd.NA])
+def test_undecodable_positions(location):
+    frame = decoded(pd.Series(['0200688', location, '0010182'], dtype=object))
+    assert frame.values.tolist() == [[20, 6, 88, True], [0, 0, 0, False], [1, 1, 82, True]]
+
+
+@pytest.mark.parametrize('dtype', ['string', 'category'])
+def test_missing_values_in_typed_columns(dtype):
+    frame = decoded(pd.Series(['0200688', None], dtype=dtype))
+    assert frame.values.tolist() == [[20, 6, 88, True], [0, 0, 0, False]]
+
+
+def test_deck_starts_at_tier_80():
+    frame = decoded(pd.Series(['0010178', '0010180']))
+    assert frame['Deck'].tolist() == [False, True]
+
+
+def test_empty_column():
+    frame = decoded(pd.Series([], dtype=object))
+    assert frame.empty
+    assert list(frame.columns) == ['Bay', 'Row', 'Tier', 'Deck']
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from parsers import parse_baplie, parse_coprar
+from reconcile import MISMATCH_COLUMNS, lookup_positions, reconcile_containers
+from synthetic import write_dataset
+
+
+@pytest.mark.parametrize('categorical', [False, True])
+def test_lookup_positions(categorical):
+    keys = pd.Series(['B', 'A', 'X', None, 'C'])
+    candidates = pd.Series(['A', 'B', 'C', 'B', None])
+    if categorical:
+        keys, candidates = keys.astype('category'), candidates.astype('category')
+    # Repeated candidates resolve to their last row, absent and missing keys to -1
+    assert lookup_positions(keys, candidates).tolist() == [3, 0, -1, -1, 2]
+
+
+def test_lookup_positions_shared_categories():
+    numbers = pd.Series(pd.Categorical(['A', 'B', 'A', 'C']))
+    assert lookup_positions(numbers, numbers).tolist() == [2, 1, 2, 3]
+    assert lookup_positions(numbers, numbers.iloc[:0]).tolist() == [-1, -1, -1, -1]
+
+
+def test_reconcile_containers():
+    baplie = pd.DataFrame({
+        'ContainerNumber': ['AAAU0000001', 'BBBU0000002', 'CCCU0000003', 'DDDU0000004'],
+        'Weight': [20000.0, 15000.0, 0.0, 12000.0],
+        'Length': [0.0, 1219.0, 0.0, 610.0],
+        'Width': [0.0, 0.0, 0.0, 0.0],
+        'Height': [0.0, 0.0, 0.0, 0.0],
+    })
+    # DDDU0000004 is only in the BAPLIE, EEEU0000005 only in the COPRAR
+    coprar = pd.DataFrame({
+        'ContainerNumber': ['EEEU0000005', 'CCCU0000003', 'BBBU0000002', 'AAAU0000001'],
+        'Weight': [9000.0, 8000.0, 15500.0, 20000.0],
+        'Length': [610.0, 610.0, 1219.0, 610.0],
+        'Width': [244.0, 244.0, np.nan, 244.0],
+        'Height': [259.0, 259.0, 290.0, np.nan],
+    })
+    details, mismatches = reconcile_containers(baplie, coprar)
+
+    assert details['ContainerNumber'].tolist() == baplie['ContainerNumber'].tolist()
+    # BAPLIE values win, COPRAR fills what BAPLIE leaves at 0
+    assert details['Weight'].tolist() == [20000.0, 15000.0, 8000.0, 12000.0]
+    assert details['Length'].tolist() == [610.0, 1219.0, 610.0, 610.0]
+    assert details['Width'].tolist() == [244.0, 0.0, 244.0, 0.0]
+    assert details['Height'].tolist() == [0.0, 290.0, 259.0, 0.0]
+
+    assert list(mismatches.columns) == MISMATCH_COLUMNS
+    assert mismatches.values.tolist() == [['BBBU0000002', 'Weight', 15000.0, 15500.0, -500.0]]
+    assert reconcile_containers(baplie, coprar, tolerance=500.0)[1].empty
+
+
+def test_reconcile_synthetic_messages(tmp_path):
+    plan, paths = write_dataset(str(tmp_path), 2000, layout='feeder', seed=4)
+    baplie = parse_baplie(paths['baplie'])[1]
+    coprar = parse_coprar(paths['coprar'])
+    details, mismatches = reconcile_containers(baplie, coprar)
+
+    merged = plan.merge(coprar, on='ContainerNumber', suffixes=('', '_coprar'))
+    expected = merged[merged['Weight'] != merged['Weight_coprar']]
+    assert len(expected) > 0
+    assert sorted(mismatches['ContainerNumber']) == sorted(expected['ContainerNumber'])
+    assert (mismatches['Field'] == 'Weight').all()
+    by_number = mismatches.set_index('ContainerNumber')
+    assert (by_number.loc[expected['ContainerNumber'], 'COPRAR'].to_numpy() == expected['Weight_coprar'].to_numpy()).all()
+    # BAPLIE carries no DIM, so dimensions come from the COPRAR
+    assert details['Length'].tolist() == plan['Length'].tolist()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stability import ROW_SPACING_METRES, StabilityModel
+
+
+@pytest.fixture
+def stow():
+    # One hatch: a heavy box far to starboard that lists the vessel on arrival,
+    # then a 10 t pair either side of the centreline
+    return pd.DataFrame({
+        'Bay': [2, 2, 2, 2, 2],
+        'Row': [7, 1, 2, 3, 4],
+        'Tier': [2, 2, 2, 2, 2],
+        'Weight': [30000.0, 10000.0, 10000.0, 10000.0, 10000.0],
+    })
+
+
+def test_stress_after_each_move(stow):
+    model = StabilityModel(stow)
+    # Rows 1 and 3 are starboard, 2 and 4 port, the second pair one row spacing further out
+    assert model.score([0, 1, 2, 3, 4])[0] == pytest.approx(20 * ROW_SPACING_METRES)
+    assert model.score([0, 1, 3, 2, 4])[0] == pytest.approx(30 * ROW_SPACING_METRES)
+    # Keeping the heavy box to the end leaves its whole moment on board until then
+    assert model.score([1, 2, 3, 4, 0])[0] == pytest.approx(30 * 4 * ROW_SPACING_METRES)
+
+
+def test_full_stow_does_not_mask_sequences(stow):
+    # The arrival list of 300 t·m would be the peak of every one of these sequences
+    model = StabilityModel(stow)
+    sequences = np.array([[0, 1, 2, 3, 4], [0, 1, 3, 2, 4], [1, 0, 2, 3, 4], [1, 2, 3, 4, 0]])
+    assert model.score(sequences).tolist() == pytest.approx([50.0, 75.0, 275.0, 300.0])
+
+
+def test_trim_counts_a_tenth():
+    data = pd.DataFrame({'Bay': [2, 6], 'Row': [0, 0], 'Tier': [2, 2], 'Weight': [10000.0, 10000.0]})
+    model = StabilityModel(data)
+    # Centreline row 0, 40ft bays 0 and 1 sit half a bay spacing either side of the middle
+    assert model.score([0, 1])[0] == pytest.approx(0.1 * 10 * 0.5 * 12.5)
+
+
+def test_empty_sequence():
+    model = StabilityModel(pd.DataFrame({'Bay': [], 'Row': [], 'Tier': [], 'Weight': []}))
+    assert model.score(np.empty((2, 0), dtype=np.intp)).tolist() == [0.0, 0.0]
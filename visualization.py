@@ -1,21 +1,104 @@
+import base64
+
+import numpy as np
 import pandas as pd
 from jinja2 import Template
+from parsers import decode_stowage_positions
+
+# Metres per step of the ISO bay/row/tier numbering
+BAY_PITCH_METRES = 3.2  # Odd bays are 20ft slots, an even bay sits between its two
+ROW_PITCH_METRES = 2.5
+TIER_PITCH_METRES = 1.3  # Tiers are numbered in steps of two
+DECK_BASE_METRES = 28.0  # Height of deck tier 80, above the hatch covers
+# Standard box sizes in metres for containers without a DIM segment
+DEFAULT_LENGTH = {20: 6.06, 40: 12.19}
+DEFAULT_WIDTH = 2.44
+DEFAULT_HEIGHT = 2.59
+SERIAL_NONE = 0xFFFFFFFF  # Container numbers without a 7 digit serial travel whole in the prefix table
 
 def map_to_3d_coordinates(container_data):
-    def extract_coordinate(loc, index):
-        try:
-            parts = loc.split(':')
-            return int(parts[index]) if len(parts) > index else 0
-        except:
-            return 0
-
-    container_data['X'] = container_data['Location'].apply(lambda loc: extract_coordinate(loc, 0))
-    container_data['Y'] = container_data['Location'].apply(lambda loc: extract_coordinate(loc, 1))
-    container_data['Z'] = container_data['Location'].apply(lambda loc: extract_coordinate(loc, 2))
+    # X runs along the ship from the bow, Y is height and Z is across the ship, starboard positive
+    if 'Bay' not in container_data.columns:
+        container_data = container_data.assign(**decode_stowage_positions(container_data['Location']))
+    bay = container_data['Bay'].to_numpy(dtype=np.float64, na_value=0)
+    row = container_data['Row'].to_numpy(dtype=np.float64, na_value=0)
+    tier = container_data['Tier'].to_numpy(dtype=np.float64, na_value=0)
+    container_data['X'] = bay * BAY_PITCH_METRES
+    container_data['Y'] = np.where(tier >= 80, DECK_BASE_METRES + (tier - 80) * TIER_PITCH_METRES, tier * TIER_PITCH_METRES)
+    container_data['Z'] = np.where(row % 2 == 1, (row + 1) // 2, -(row // 2)) * ROW_PITCH_METRES
     return container_data
 
-def visualize_containers_3d(container_data):
-    container_data = map_to_3d_coordinates(container_data)    
+def box_dimensions(container_data):
+    # Length, Height and Width in metres from the centimetre DIM values, standard sizes where missing
+    def measure(name, default):
+        if name not in container_data.columns:
+            return np.broadcast_to(default, len(container_data)).astype(np.float64)
+        values = container_data[name].to_numpy(dtype=np.float64, na_value=0) / 100
+        return np.where(values > 0, values, default)
+
+    bay = container_data['Bay'].to_numpy(dtype=np.float64, na_value=0)
+    default_length = np.where(bay % 2 == 0, DEFAULT_LENGTH[40], DEFAULT_LENGTH[20])
+    return measure('Length', default_length), measure('Height', DEFAULT_HEIGHT), measure('Width', DEFAULT_WIDTH)
+
+def _encode(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+def _table_index(inverse, size):
+    # Index into a lookup table, in the narrowest typed array that holds it
+    if size <= 1 << 16:
+        return {'type': 'Uint16Array', 'data': _encode(inverse, '<u2')}
+    return {'type': 'Uint32Array', 'data': _encode(inverse, '<u4')}
+
+def container_payload(container_data, color_by='Weight'):
+    """Packed typed arrays for the 3D page, base64 encoded.
+
+    Positions and colour values are little-endian Float32, bay/row/tier
+    Uint16. Box sizes (in centimetres) and container owner prefixes repeat
+    across the stow, so they go into small tables that each container
+    indexes, and the 7 digit serial of a container number is a Uint32
+    (SERIAL_NONE when the number has none).
+    """
+    container_data = map_to_3d_coordinates(container_data.copy())
+    count = len(container_data)
+    length, height, width = box_dimensions(container_data)
+    sizes, size_index = np.unique(np.rint(np.column_stack([length, height, width]) * 100).astype(np.int64),
+                                  axis=0, return_inverse=True)
+    if color_by in container_data.columns:
+        values = container_data[color_by].to_numpy(dtype=np.float64, na_value=0)
+    else:
+        values = np.zeros(count)
+    if 'ContainerNumber' in container_data.columns:
+        numbers = container_data['ContainerNumber'].fillna('').astype(str)
+    else:
+        numbers = pd.Series([''] * count, dtype=str)
+    parts = numbers.str.extract(r'^(.*?)(\d{7})$')
+    prefix = parts[0].fillna(numbers)
+    serial = pd.to_numeric(parts[1], errors='coerce').fillna(SERIAL_NONE).to_numpy(dtype=np.uint32)
+    prefixes, prefix_index = np.unique(prefix.to_numpy(dtype=object).astype(str), return_inverse=True)
+    return {
+        'count': count,
+        'color_by': color_by,
+        'position': _encode(container_data[['X', 'Y', 'Z']].to_numpy(dtype=np.float64), '<f4'),
+        'slot': _encode(container_data[['Bay', 'Row', 'Tier']].to_numpy(dtype=np.float64, na_value=0), '<u2'),
+        'value': _encode(values, '<f4'),
+        'sizes': sizes.ravel().tolist(),
+        'size_index': _table_index(size_index.ravel(), len(sizes)),
+        'prefixes': prefixes.tolist(),
+        'prefix_index': _table_index(prefix_index.ravel(), len(prefixes)),
+        'serial': _encode(serial, '<u4'),
+    }
+
+def visualize_containers_3d(container_data, color_by='Weight'):
+    """Three.js page drawing every container as one instance of a shared box.
+
+    All boxes go into a single InstancedMesh, so the scene is one draw call
+    however large the vessel. color_by names a numeric column mapped onto a
+    blue-to-red ramp, e.g. 'Weight' or a discharge 'Order'. Hovering a box
+    shows its number, position and value. The containers travel as the
+    packed arrays of container_payload rather than as JSON records.
+    """
+    payload = container_payload(container_data, color_by)
+
     html_template = """
     <!DOCTYPE html>
     <html lang="en">
@@ -25,45 +108,116 @@ def visualize_containers_3d(container_data):
         <style>
             body { margin: 0; }
             canvas { display: block; }
+            #tooltip { position: absolute; display: none; padding: 4px 8px; background: rgba(0, 0, 0, 0.75); color: #fff; font: 12px sans-serif; pointer-events: none; }
         </style>
     </head>
     <body>
+        <div id="tooltip"></div>
         <script src="https://cdnjs.cloudflare.com/ajax/libs/three.js/r128/three.min.js"></script>
         <script src="https://cdn.jsdelivr.net/npm/three@0.128.0/examples/js/loaders/GLTFLoader.js"></script>
+        <script src="https://cdn.jsdelivr.net/npm/three@0.128.0/examples/js/controls/OrbitControls.js"></script>
         <script>
-            console.log('Container Data:', {{container_data}});
-            const containerData = {{ container_data | safe }};
-            console.log('Container Data:', containerData);
+            // Packed container arrays, see container_payload
+            const payload = {{ payload | tojson }};
+            function decode(data, ArrayType) {
+                const bytes = Uint8Array.from(atob(data), c => c.charCodeAt(0));
+                return new ArrayType(bytes.buffer);
+            }
+            const count = payload.count;
+            const colorBy = payload.color_by;
+            const positions = decode(payload.position, Float32Array);
+            const slots = decode(payload.slot, Uint16Array);
+            const values = decode(payload.value, Float32Array);
+            const sizeIndex = decode(payload.size_index.data, self[payload.size_index.type]);
+            const prefixIndex = decode(payload.prefix_index.data, self[payload.prefix_index.type]);
+            const serials = decode(payload.serial, Uint32Array);
+            const SERIAL_NONE = {{ serial_none }};
 
             // Setup scene, camera, and renderer
             const scene = new THREE.Scene();
-            const camera = new THREE.PerspectiveCamera(75, window.innerWidth / window.innerHeight, 0.1, 1000);
-            const renderer = new THREE.WebGLRenderer();
+            const camera = new THREE.PerspectiveCamera(60, window.innerWidth / window.innerHeight, 0.5, 5000);
+            const renderer = new THREE.WebGLRenderer({ antialias: true });
             renderer.setSize(window.innerWidth, window.innerHeight);
             document.body.appendChild(renderer.domElement);
+            scene.add(new THREE.AmbientLight(0xffffff, 0.6));
+            const sun = new THREE.DirectionalLight(0xffffff, 0.6);
+            sun.position.set(1, 2, 1);
+            scene.add(sun);
 
             // Load ship model
             const loader = new THREE.GLTFLoader();
             loader.load('/static/scene.gltf', function(gltf) {
-                const ship = gltf.scene;
-                scene.add(ship);
-                animate();
+                scene.add(gltf.scene);
             }, undefined, function(error) {
                 console.error('An error happened during loading the GLTF model:', error);
             });
 
-            // Add containers
-            containerData.forEach(container => {
-                const geometry = new THREE.BoxGeometry(container.Length, container.Height, container.Width);
-                const material = new THREE.MeshBasicMaterial({ color: 0x00ff00 });
-                const cube = new THREE.Mesh(geometry, material);
-                cube.position.set(container.X, container.Y, container.Z);
-                scene.add(cube);
-                console.log('Added container:', container);
+            // All containers share one geometry and material, drawn in a single call
+            const mesh = new THREE.InstancedMesh(new THREE.BoxGeometry(1, 1, 1), new THREE.MeshLambertMaterial(), count);
+            const matrix = new THREE.Matrix4();
+            const position = new THREE.Vector3();
+            const scale = new THREE.Vector3();
+            const rotation = new THREE.Quaternion();
+            const color = new THREE.Color();
+            let low = Infinity, high = -Infinity;
+            values.forEach(value => { low = Math.min(low, value); high = Math.max(high, value); });
+            const span = high > low ? high - low : 1;
+            for (let i = 0; i < count; i++) {
+                // Sizes are in centimetres
+                const sizes = payload.sizes, s = sizeIndex[i] * 3;
+                position.fromArray(positions, i * 3);
+                scale.set(sizes[s] * 0.0098, sizes[s + 1] * 0.0098, sizes[s + 2] * 0.0098);
+                matrix.compose(position, rotation, scale);
+                mesh.setMatrixAt(i, matrix);
+                mesh.setColorAt(i, color.setHSL(0.66 * (1 - (values[i] - low) / span), 0.8, 0.5));
+            }
+            mesh.instanceMatrix.needsUpdate = true;
+            if (mesh.instanceColor) mesh.instanceColor.needsUpdate = true;
+            scene.add(mesh);
+
+            // Frame the stow and orbit around its centre
+            const bounds = new THREE.Box3();
+            for (let i = 0; i < count; i++) bounds.expandByPoint(position.fromArray(positions, i * 3));
+            const centre = count ? bounds.getCenter(new THREE.Vector3()) : new THREE.Vector3();
+            const size = count ? bounds.getSize(new THREE.Vector3()).length() : 10;
+            camera.position.set(centre.x + size * 0.6, centre.y + size * 0.5, centre.z + size * 0.8);
+            const controls = new THREE.OrbitControls(camera, renderer.domElement);
+            controls.target.copy(centre);
+            controls.update();
+
+            function containerNumber(i) {
+                const prefix = payload.prefixes[prefixIndex[i]];
+                return serials[i] === SERIAL_NONE ? prefix : prefix + String(serials[i]).padStart(7, '0');
+            }
+            function stowagePosition(i) {
+                const pad = (n, width) => String(n).padStart(width, '0');
+                return pad(slots[i * 3], 3) + pad(slots[i * 3 + 1], 2) + pad(slots[i * 3 + 2], 2);
+            }
+
+            // Hover picking on the instanced mesh
+            const raycaster = new THREE.Raycaster();
+            const pointer = new THREE.Vector2();
+            const tooltip = document.getElementById('tooltip');
+            renderer.domElement.addEventListener('pointermove', event => {
+                pointer.set((event.clientX / window.innerWidth) * 2 - 1, -(event.clientY / window.innerHeight) * 2 + 1);
+                raycaster.setFromCamera(pointer, camera);
+                const hit = raycaster.intersectObject(mesh)[0];
+                if (hit === undefined) {
+                    tooltip.style.display = 'none';
+                    return;
+                }
+                const i = hit.instanceId;
+                tooltip.textContent = containerNumber(i) + ' @ ' + stowagePosition(i) + ', ' + colorBy + ': ' + values[i];
+                tooltip.style.left = (event.clientX + 12) + 'px';
+                tooltip.style.top = (event.clientY + 12) + 'px';
+                tooltip.style.display = 'block';
             });
 
-            // Setup camera position
-            camera.position.z = 10;
+            window.addEventListener('resize', () => {
+                camera.aspect = window.innerWidth / window.innerHeight;
+                camera.updateProjectionMatrix();
+                renderer.setSize(window.innerWidth, window.innerHeight);
+            });
 
             // Animation loop
             function animate() {
@@ -76,7 +230,7 @@ def visualize_containers_3d(container_data):
     </body>
     </html>
     """
-    
+
     template = Template(html_template)
-    html = template.render(container_data=container_data.to_dict(orient='records'))
-    return html
\ No newline at end of file
+    html = template.render(payload=payload, serial_none=SERIAL_NONE)
+    return html